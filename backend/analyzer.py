@@ -1,7 +1,46 @@
 import math
+from typing import Literal, NamedTuple, Optional
+
+import numpy as np
+
+from chords import CHORD_MASK_MATRIX, CHORD_MATCHES
 
 NOTES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
 
+# Search range for guitar/ukulele fundamentals: a little below drop-D low D
+# (~73 Hz) up to high frets on the first string.
+MIN_PITCH_HZ = 60.0
+MAX_PITCH_HZ = 1400.0
+
+# Frames quieter than this RMS are treated as silence (matches the old JS tuner)
+SILENCE_RMS = 0.02
+
+# Chord recognition: spectral peaks below this are considered the bass
+# register, and a chord rooted on the bass note gets this much score bonus
+BASS_CUTOFF_HZ = 200.0
+BASS_ROOT_BONUS = 0.05
+
+SampleFormat = Literal["float32", "int16"]
+
+Temperament = Literal["equal", "just", "pythagorean", "meantone"]
+
+# Deviation of each pitch class from 12-TET in cents, for temperaments
+# built on C. Tables are shifted so A stays at the reference pitch.
+TEMPERAMENT_CENTS: dict[str, list[float]] = {
+    "equal": [0.0] * 12,
+    "just": [0.0, 11.73, 3.91, 15.64, -13.69, -1.96, -9.78, 1.96, 13.69, -15.64, 17.6, -11.73],
+    "pythagorean": [0.0, 13.69, 3.91, -5.87, 7.82, -1.96, 11.73, 1.96, 15.64, 5.87, -3.91, 9.78],
+    "meantone": [0.0, -23.95, -6.84, 10.26, -13.69, 3.42, -20.53, -3.42, -27.37, -10.26, 6.84, -17.11],
+}
+
+# Offsets in semitones, indexed [temperament][pitch class]
+TEMPERAMENT_OFFSETS: dict[str, np.ndarray] = {
+    name: (np.array(cents) - cents[9]) / 100 for name, cents in TEMPERAMENT_CENTS.items()
+}
+
+# Neighbouring note numbers checked when a temperament moves note centers
+NEIGHBOURS = np.array([-1, 0, 1])
+
 def identify_pitch(hz: float):
     if hz <= 0:
          return None
@@ -12,6 +51,9 @@ def identify_pitch(hz: float):
 
     rounded_midi = round(midi_number)
 
+    return describe_pitch(hz, midi_number, rounded_midi)
+
+def describe_pitch(hz: float, midi_number: float, rounded_midi: int):
     # Cents difference: 100 * (actual - rounded)
     cents = (midi_number - rounded_midi) * 100
 
@@ -33,3 +75,310 @@ def identify_pitch(hz: float):
         "octave": octave,
         "midi": rounded_midi
     }
+
+class PitchArrays(NamedTuple):
+    """Parallel per-frequency results of identify_pitches; invalid inputs have midi == -1."""
+    note_index: np.ndarray
+    octave: np.ndarray
+    midi: np.ndarray
+    cents: np.ndarray
+    perfect_hz: np.ndarray
+
+def identify_pitches(hz: np.ndarray, reference_hz: float = 440.0, temperament: Temperament = "equal") -> PitchArrays:
+    """
+    Array version of identify_pitch: resolves every frequency to its nearest
+    note under the given reference pitch (for A4) and temperament.
+    """
+    hz = np.asarray(hz, dtype=np.float64)
+    valid = np.isfinite(hz) & (hz > 0)
+    midi_number = 12 * np.log2(np.where(valid, hz, reference_hz) / reference_hz) + 69
+
+    offsets = TEMPERAMENT_OFFSETS[temperament]
+    if offsets.any():
+        # Detuned note centers can pull the nearest note across the 12-TET boundary
+        candidates = np.rint(midi_number).astype(np.int64)[..., None] + NEIGHBOURS
+        centers = candidates + offsets[candidates % 12]
+        nearest = np.argmin(np.abs(midi_number[..., None] - centers), axis=-1)[..., None]
+        rounded_midi = np.take_along_axis(candidates, nearest, axis=-1)[..., 0]
+        center = np.take_along_axis(centers, nearest, axis=-1)[..., 0]
+    else:
+        rounded_midi = np.rint(midi_number).astype(np.int64)
+        center = rounded_midi
+
+    cents = (midi_number - center) * 100
+    perfect_hz = reference_hz * np.exp2((center - 69) / 12)
+    return PitchArrays(
+        note_index=np.where(valid, rounded_midi % 12, -1).astype(np.int8),
+        octave=np.where(valid, rounded_midi // 12 - 1, 0).astype(np.int16),
+        midi=np.where(valid, rounded_midi, -1).astype(np.int16),
+        cents=np.where(valid, cents, np.nan).astype(np.float32),
+        perfect_hz=np.where(valid, perfect_hz, np.nan).astype(np.float32),
+    )
+
+SAMPLE_SIZES = {"float32": 4, "int16": 2}
+
+def frame_error(data: bytes, sample_format: SampleFormat = "float32") -> Optional[str]:
+    """Why a frame can't be decoded as whole samples, or None if it can."""
+    if len(data) % SAMPLE_SIZES[sample_format]:
+        return f"{sample_format} frames must be a multiple of {SAMPLE_SIZES[sample_format]} bytes, got {len(data)}."
+    return None
+
+def decode_frame(data: bytes, sample_format: SampleFormat = "float32") -> np.ndarray:
+    """
+    Views a raw little-endian PCM frame as samples without copying the
+    buffer. Int16 frames are scaled to [-1, 1) floats.
+    """
+    if sample_format == "int16":
+        return np.frombuffer(memoryview(data), dtype="<i2").astype(np.float32) / 32768.0
+    return np.frombuffer(memoryview(data), dtype="<f4")
+
+def detect_pitch(
+    samples: np.ndarray,
+    sample_rate: int,
+    threshold: float = 0.15,
+    min_hz: float = MIN_PITCH_HZ,
+    max_hz: float = MAX_PITCH_HZ,
+) -> Optional[float]:
+    """
+    Estimates the fundamental frequency of a mono frame with the YIN
+    algorithm. Returns None for silent or unpitched frames.
+    """
+    x = np.asarray(samples, dtype=np.float64)
+    if x.size == 0 or np.sqrt(np.mean(x * x)) < SILENCE_RMS:
+        return None
+
+    window = x.size // 2
+    tau_min = max(2, int(sample_rate / max_hz))
+    tau_max = min(window, int(sample_rate / min_hz) + 1)
+    if tau_max <= tau_min + 1:
+        return None
+
+    # Difference function d(tau) = sum (x[j] - x[j + tau])^2 over the window,
+    # expanded into energy terms plus an FFT cross-correlation.
+    size = 1 << (x.size + window - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(x, size) * np.conj(np.fft.rfft(x[:window], size)), size)[:tau_max]
+    energy = np.concatenate(([0.0], np.cumsum(x * x)))
+    lagged_energy = energy[window:window + tau_max] - energy[:tau_max]
+    diff = energy[window] + lagged_energy - 2 * corr
+    diff[0] = 0.0
+
+    # Cumulative mean normalized difference
+    cmndf = np.ones(tau_max)
+    running = np.cumsum(diff[1:])
+    cmndf[1:] = diff[1:] * np.arange(1, tau_max) / np.where(running > 0, running, 1.0)
+
+    below = np.flatnonzero(cmndf[tau_min:] < threshold)
+    if below.size == 0:
+        return None
+    tau = tau_min + int(below[0])
+    # Walk down to the bottom of this dip
+    rising = np.flatnonzero(np.diff(cmndf[tau:]) >= 0)
+    tau += int(rising[0]) if rising.size else 0
+
+    # Parabolic interpolation around the minimum for sub-sample precision
+    if 0 < tau < tau_max - 1:
+        left, center, right = cmndf[tau - 1], cmndf[tau], cmndf[tau + 1]
+        denominator = left - 2 * center + right
+        offset = 0.5 * (left - right) / denominator if denominator else 0.0
+    else:
+        offset = 0.0
+    return sample_rate / (tau + offset)
+
+class PitchTracker:
+    """
+    Turns a stream of PCM frames into stable tuner readings.
+
+    The pitch is smoothed exponentially in the MIDI domain. Jumps of more than
+    a semitone must persist for `hold_frames` frames before they are accepted,
+    and the reported note only changes once the pitch leaves the current
+    note by `hysteresis_cents` beyond the usual +/-50 cent boundary.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        sample_format: SampleFormat = "float32",
+        smoothing: float = 0.35,
+        hysteresis_cents: float = 15.0,
+        hold_frames: int = 2,
+    ):
+        self.sample_rate = sample_rate
+        self.sample_format = sample_format
+        self.smoothing = smoothing
+        self.hysteresis_cents = hysteresis_cents
+        self.hold_frames = hold_frames
+        self.reset()
+
+    def reset(self) -> None:
+        self.midi: Optional[float] = None
+        self.note: Optional[int] = None
+        self.pending: list[float] = []
+        self.silent_frames = 0
+
+    def process(self, data: bytes):
+        return self.update(decode_frame(data, self.sample_format))
+
+    def update(self, samples: np.ndarray):
+        hz = detect_pitch(samples, self.sample_rate)
+        if hz is None:
+            self.silent_frames += 1
+            # Ride out short dropouts between picks instead of flickering
+            if self.silent_frames > self.hold_frames:
+                self.reset()
+            return self.current()
+        self.silent_frames = 0
+
+        midi_number = 12 * math.log2(hz / 440) + 69
+        if self.midi is None:
+            self.midi = midi_number
+        elif abs(midi_number - self.midi) > 1:
+            # Possible new note or an octave error; wait for it to settle
+            self.pending.append(midi_number)
+            if len(self.pending) < self.hold_frames:
+                return self.current()
+            if max(self.pending) - min(self.pending) > 1:
+                self.pending = self.pending[1:]
+                return self.current()
+            self.midi = sum(self.pending) / len(self.pending)
+            self.note = None
+        else:
+            self.midi += self.smoothing * (midi_number - self.midi)
+        self.pending = []
+
+        boundary = 0.5 + self.hysteresis_cents / 100
+        if self.note is None or abs(self.midi - self.note) > boundary:
+            self.note = round(self.midi)
+        return self.current()
+
+    def current(self):
+        if self.midi is None or self.note is None:
+            return None
+        hz = 440 * (2 ** ((self.midi - 69) / 12))
+        return describe_pitch(hz, self.midi, self.note)
+
+class ChordStream:
+    """
+    Incremental chord recognition from streamed mono audio.
+
+    Incoming samples are cut into non-overlapping hops and each hop is
+    windowed and FFT'd exactly once. Its 12-bin chroma is overlap-added into a
+    running sum over the last `history` hops, so the analysis window spans
+    several hops without re-transforming old samples. Each hop's chroma is
+    scored against every (root, chord type) template from CHORD_DEFINITIONS
+    and an event is emitted when the best match changes and holds.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        sample_format: SampleFormat = "float32",
+        hop_size: int = 4096,
+        history: int = 3,
+        min_confidence: float = 0.75,
+        hold_hops: int = 2,
+    ):
+        self.sample_rate = sample_rate
+        self.sample_format = sample_format
+        self.hop_size = hop_size
+        self.history = history
+        self.min_confidence = min_confidence
+        self.hold_hops = hold_hops
+
+        # Zero-padding to twice the hop interpolates the spectrum for the low strings
+        self.fft_size = 2 * hop_size
+        self.window = np.hanning(hop_size).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.fft_size, 1 / sample_rate)
+        in_range = (freqs >= MIN_PITCH_HZ) & (freqs <= 5000)
+        # Below 10 kHz the band reaches Nyquist; the last bin has no right-hand neighbour to compare peaks with
+        in_range[-1] = False
+        midi = 12 * np.log2(np.where(in_range, freqs, 440) / 440) + 69
+        self.bins = np.flatnonzero(in_range)
+        self.bin_classes = np.rint(midi[self.bins]).astype(np.int64) % 12
+        self.bass_bins = freqs[self.bins] < BASS_CUTOFF_HZ
+
+        self.pending = np.zeros(0, dtype=np.float32)
+        # Running sums of full-range and bass-register chroma over recent hops
+        self.recent = np.zeros((history, 2, 12))
+        self.chroma = np.zeros((2, 12))
+        self.hops = 0
+        self.chord: Optional[dict] = None
+        self.candidate: Optional[str] = None
+        self.candidate_hops = 0
+
+    def process(self, data: bytes) -> list[dict]:
+        return self.feed(decode_frame(data, self.sample_format))
+
+    def feed(self, samples: np.ndarray) -> list[dict]:
+        """Consumes a chunk of any length and returns chord-change events."""
+        buffered = np.concatenate((self.pending, samples)) if self.pending.size else samples
+        events = []
+        complete = buffered.size - buffered.size % self.hop_size
+        for start in range(0, complete, self.hop_size):
+            event = self.analyze_hop(buffered[start:start + self.hop_size])
+            if event:
+                events.append(event)
+        self.pending = np.array(buffered[complete:], dtype=np.float32)
+        return events
+
+    def analyze_hop(self, hop: np.ndarray) -> Optional[dict]:
+        spectrum = np.abs(np.fft.rfft(hop * self.window, self.fft_size))
+        # Only spectral peaks count, so window leakage from a note doesn't bleed
+        # into the neighbouring semitone (E vs F in a C major chord, etc.)
+        magnitude = spectrum[self.bins]
+        peaks = (magnitude > spectrum[self.bins - 1]) & (magnitude >= spectrum[self.bins + 1])
+        power = np.where(peaks, magnitude, 0.0) ** 2
+        hop_chroma = np.stack((
+            np.bincount(self.bin_classes, weights=power, minlength=12),
+            np.bincount(self.bin_classes, weights=np.where(self.bass_bins, power, 0.0), minlength=12),
+        ))
+
+        # Running sum over the last `history` hops
+        slot = self.hops % self.history
+        self.chroma += hop_chroma - self.recent[slot]
+        self.recent[slot] = hop_chroma
+        self.hops += 1
+
+        rms = float(np.sqrt(np.mean(np.square(hop, dtype=np.float64))))
+        label, confidence = None, 0.0
+        amplitude = np.sqrt(np.maximum(self.chroma[0], 0))
+        norm = np.linalg.norm(amplitude)
+        if rms >= SILENCE_RMS and norm > 0:
+            similarity = CHORD_TEMPLATES @ (amplitude / norm)
+            # Break near-ties between chords sharing tones (C#m vs Amaj7) in
+            # favour of the one rooted on the bass note
+            bass = self.chroma[1]
+            scores = similarity + BASS_ROOT_BONUS * (CHORD_ROOTS == int(np.argmax(bass))) if bass.max() > 0 else similarity
+            best = int(np.argmax(scores))
+            if similarity[best] >= self.min_confidence:
+                label, confidence = CHORD_LABELS[best], float(similarity[best])
+        return self.update_chord(label, confidence)
+
+    def update_chord(self, label: Optional[str], confidence: float) -> Optional[dict]:
+        current = self.chord["chord"] if self.chord else None
+        if label == current:
+            self.candidate, self.candidate_hops = None, 0
+            return None
+        if label != self.candidate:
+            self.candidate, self.candidate_hops = label, 0
+        self.candidate_hops += 1
+        if self.candidate_hops < self.hold_hops:
+            return None
+
+        self.candidate, self.candidate_hops = None, 0
+        self.chord = {
+            "time": self.hops * self.hop_size / self.sample_rate,
+            "chord": label,
+            "confidence": confidence,
+        }
+        return self.chord
+
+def chord_templates() -> tuple[np.ndarray, list[str]]:
+    """Unit-length pitch-class templates for every (root, chord type) pair, with their names."""
+    masks = CHORD_MASK_MATRIX.reshape(-1).astype(np.int64)
+    templates = ((masks[:, None] >> np.arange(12)) & 1).astype(np.float64)
+    templates /= np.linalg.norm(templates, axis=1, keepdims=True)
+    labels = [full_name for row in CHORD_MATCHES for _, _, _, full_name in row]
+    return templates, labels
+
+CHORD_TEMPLATES, CHORD_LABELS = chord_templates()
+CHORD_ROOTS = np.repeat(np.arange(CHORD_MASK_MATRIX.shape[0]), CHORD_MASK_MATRIX.shape[1])
@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from typing import Dict, NamedTuple, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are skipped; gzip still works
+    brotli = None
+
+# Vite emits hashed names like assets/index-B7r5XJ0o.js
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8}\.[a-z0-9]+$")
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/manifest+json")
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+SHORT_LIVED = "public, max-age=3600"
+
+class Variant(NamedTuple):
+    body: bytes
+    etag: str
+
+class Asset(NamedTuple):
+    content_type: str
+    cache_control: str
+    variants: Dict[str, Variant]  # keyed by content-coding; "identity" always present
+
+def make_asset(body: bytes, content_type: str, cache_control: str, precompressed: Optional[Dict[str, bytes]] = None) -> Asset:
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    variants = {"identity": Variant(body, f'"{digest}"')}
+
+    if content_type.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_COMPRESS_SIZE:
+        candidates = dict(precompressed or {})
+        if "gzip" not in candidates:
+            candidates["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        if "br" not in candidates and brotli:
+            candidates["br"] = brotli.compress(body, quality=11)
+        for coding, compressed in candidates.items():
+            if len(compressed) < len(body):
+                variants[coding] = Variant(compressed, f'"{digest}-{coding}"')
+    return Asset(content_type, cache_control, variants)
+
+def json_asset(payload, cache_control: str = SHORT_LIVED) -> Asset:
+    """A JSON response body serialized (and compressed) once, for data that never changes at runtime."""
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    return make_asset(body, "application/json", cache_control)
+
+def load_asset(path: str, url_path: str) -> Asset:
+    with open(path, "rb") as f:
+        body = f.read()
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+
+    # Prefer variants precompressed at build time, if the build made any
+    precompressed = {}
+    for coding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if os.path.isfile(path + suffix):
+            with open(path + suffix, "rb") as f:
+                precompressed[coding] = f.read()
+
+    if url_path.endswith(".html"):
+        cache_control = REVALIDATE
+    elif HASHED_NAME.search(url_path):
+        cache_control = IMMUTABLE
+    else:
+        cache_control = SHORT_LIVED
+    return make_asset(body, content_type, cache_control, precompressed)
+
+def accepted_codings(accept_encoding: str) -> Dict[str, float]:
+    codings = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            codings[coding.lower()] = q
+    return codings
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison (RFC 9110 13.1.2), so W/"x" matches "x"."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+class AssetStore:
+    """
+    The built SPA held in memory: every file under `root` is read once at
+    startup with gzip/brotli variants and strong ETags precomputed, ready
+    for respond().
+    """
+
+    def __init__(self, root: str):
+        self.assets: Dict[str, Asset] = {}
+        for directory, _, files in os.walk(root):
+            for name in files:
+                if name.endswith((".gz", ".br")):
+                    continue
+                path = os.path.join(directory, name)
+                url_path = "/" + os.path.relpath(path, root).replace(os.sep, "/")
+                self.assets[url_path] = load_asset(path, url_path)
+
+    def get(self, url_path: str) -> Optional[Asset]:
+        return self.assets.get(url_path)
+
+def respond(asset: Asset, request: Request) -> Response:
+    """Serves the best variant for the request's Accept-Encoding, or 304 if the client's copy is current."""
+    codings = accepted_codings(request.headers.get("accept-encoding", ""))
+    # The acceptable coding with the client's highest q; max keeps the first of equals, so br wins ties
+    acceptable = [candidate for candidate in ("br", "gzip") if candidate in asset.variants and codings.get(candidate, 0) > 0]
+    coding = max(acceptable, key=lambda candidate: codings[candidate], default="identity")
+    variant = asset.variants[coding]
+
+    headers = {"ETag": variant.etag, "Cache-Control": asset.cache_control}
+    if len(asset.variants) > 1:
+        headers["Vary"] = "Accept-Encoding"
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, variant.etag):
+        return Response(status_code=304, headers=headers)
+
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    body = b"" if request.method == "HEAD" else variant.body
+    response = Response(body, media_type=asset.content_type, headers=headers)
+    if request.method == "HEAD":
+        response.headers["Content-Length"] = str(len(variant.body))
+    return response
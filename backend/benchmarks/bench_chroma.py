@@ -0,0 +1,100 @@
+"""
+Real-time check for analyzer.ChordStream.
+
+Synthesizes a strummed chord progression, feeds it to the stream in
+browser-sized chunks and measures the processing time of every hop. Fails if
+any recognized chord is wrong or if p99 hop latency exceeds the budget.
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_chroma
+"""
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from analyzer import ChordStream
+from chords import CHORD_DEFINITIONS, get_note_index
+
+# Lowest root we voice a chord on: E2, the open sixth string
+BASE_MIDI = 40
+
+
+def voice_chord(chord_name: str) -> List[int]:
+    """MIDI notes for a guitar-like voicing: root in the bass, chord tones stacked above, root doubled."""
+    root_name, type_name = chord_name.split(" ", 1)
+    root = BASE_MIDI + (get_note_index(root_name) - BASE_MIDI) % 12
+    intervals = sorted(CHORD_DEFINITIONS[type_name])
+    return [root] + [root + 12 + interval for interval in intervals]
+
+
+def synthesize_chord(chord_name: str, seconds: float, sample_rate: int) -> np.ndarray:
+    """Additive synthesis of a strummed chord with decaying harmonics."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    audio = np.zeros_like(t)
+    voicing = voice_chord(chord_name)
+    for position, midi in enumerate(voicing):
+        hz = 440 * 2 ** ((midi - 69) / 12)
+        delay = position * 0.012  # strum
+        envelope = np.where(t >= delay, np.exp(-(t - delay) * 1.5), 0.0)
+        for harmonic, level in enumerate((1.0, 0.5, 0.3, 0.15), start=1):
+            audio += level * envelope * np.sin(2 * np.pi * hz * harmonic * (t - delay))
+    return (0.2 * audio / len(voicing)).astype(np.float32)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample-rate", type=int, default=48000)
+    parser.add_argument("--chunk", type=int, default=1024, help="samples per incoming chunk")
+    parser.add_argument("--budget-ms", type=float, default=20.0)
+    parser.add_argument(
+        "--progression", nargs="+",
+        default=[
+            "C Major", "A Minor", "F Major", "G Dominant 7th", "E Minor", "D Sus4", "B Diminished",
+            "A Major 7th", "D Minor 7th", "E Diminished 7th", "F# Half-Diminished 7th", "E Sus2",
+            "G Major 6th", "D Add9", "C# Augmented", "A# Minor Add9", "G# Add4",
+        ],
+    )
+    args = parser.parse_args()
+
+    audio = np.concatenate([synthesize_chord(name, 2.0, args.sample_rate) for name in args.progression])
+    stream = ChordStream(args.sample_rate)
+
+    hop_times: List[float] = []
+    detected: List[str] = []
+    original = stream.analyze_hop
+
+    def timed_hop(hop: np.ndarray):
+        start = time.perf_counter()
+        event = original(hop)
+        hop_times.append(time.perf_counter() - start)
+        return event
+
+    stream.analyze_hop = timed_hop
+    for offset in range(0, audio.size, args.chunk):
+        chunk = audio[offset:offset + args.chunk]
+        for event in stream.process(chunk.tobytes()):
+            if event["chord"]:
+                detected.append(event["chord"])
+
+    latencies = np.array(hop_times) * 1e3
+    p50, p99 = np.percentile(latencies, [50, 99])
+    hop_ms = stream.hop_size / args.sample_rate * 1e3
+    print(f"audio:     {audio.size / args.sample_rate:.1f}s @ {args.sample_rate} Hz, {latencies.size} hops of {hop_ms:.1f} ms")
+    print(f"latency:   p50 {p50:.3f} ms, p99 {p99:.3f} ms, max {latencies.max():.3f} ms (budget {args.budget_ms} ms)")
+    print(f"realtime:  {audio.size / args.sample_rate / (latencies.sum() / 1e3):.0f}x")
+    print(f"expected:  {args.progression}")
+    print(f"detected:  {detected}")
+
+    failures = []
+    if p99 > args.budget_ms:
+        failures.append(f"p99 hop latency {p99:.3f} ms exceeds {args.budget_ms} ms")
+    if detected != args.progression:
+        failures.append("detected progression differs from the synthesized one")
+    if failures:
+        raise SystemExit("; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmarks for the chord and pitch engines over exhaustive inputs.
+
+Chord functions run over every 3 to 6 note pitch-class combination, with
+each note taking a turn as the bass. Catalog lookups run over every chord
+name in both sharp and flat spellings. The pitch functions sweep the guitar
+range and beyond. Each call is timed on its own, so the results include
+tail latency as well as throughput.
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_engines --output bench-engines.json
+    uv run python -m benchmarks.bench_engines --baseline   # compare against baselines/engines.json
+"""
+import argparse
+import time
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from analyzer import identify_pitch, identify_pitches
+from benchmarks import report
+from benchmarks.bench_identify import note_sets
+from chords import (
+    CHORD_DEFINITIONS, NOTES, SCALE_NAMES, get_chord_notes, get_scale, identify_chord, identify_chords, match_chords,
+    scales_containing,
+)
+from progressions import ProgressionAnalyzer
+
+FLATS = {"C#": "Db", "D#": "Eb", "F#": "Gb", "G#": "Ab", "A#": "Bb"}
+BATCH_SIZE = 1024
+PITCH_ARRAY_SIZE = 4096
+
+
+def time_calls(function: Callable, inputs: Sequence, repeat: int, batched: bool = False) -> Dict[str, float]:
+    """Times each call separately; with `batched`, each input is a list and throughput counts its items."""
+    latencies = []
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(repeat):
+        for value in inputs:
+            call_start = clock()
+            function(value)
+            latencies.append(clock() - call_start)
+    elapsed = clock() - start
+    items = repeat * sum(len(value) for value in inputs) if batched else len(latencies)
+    return report.summarize(latencies, elapsed, items)
+
+
+def chord_names() -> List[str]:
+    names = []
+    for root in NOTES:
+        for type_name in CHORD_DEFINITIONS:
+            names.append(f"{root} {type_name}")
+            if root in FLATS:
+                names.append(f"{FLATS[root]} {type_name}")
+    return names
+
+
+def run(args: argparse.Namespace) -> report.Results:
+    sets = note_sets(args.min_notes, args.max_notes)
+    batches = [sets[i:i + BATCH_SIZE] for i in range(0, len(sets), BATCH_SIZE)]
+    names = chord_names()
+    pitches = np.geomspace(20.0, 5000.0, 10000).tolist() + [0.0, -1.0]
+    pitch_arrays = np.array_split(np.geomspace(20.0, 5000.0, PITCH_ARRAY_SIZE * 16), 16)
+    print(f"inputs: {len(sets)} note sets, {len(names)} chord names, {len(pitches)} frequencies")
+
+    return {
+        "identify_chord": time_calls(identify_chord, sets, args.repeat),
+        "identify_chords[batch]": time_calls(identify_chords, batches, args.repeat, batched=True),
+        "match_chords": time_calls(match_chords, sets, args.repeat),
+        "get_chord_notes": time_calls(get_chord_notes, names, args.repeat),
+        "scales_containing": time_calls(scales_containing, sets, args.repeat),
+        "get_scale": time_calls(get_scale, SCALE_NAMES, args.repeat),
+        "progression_add": time_calls(ProgressionAnalyzer().add, names, args.repeat),
+        "identify_pitch": time_calls(identify_pitch, pitches, args.repeat),
+        "identify_pitches[array]": time_calls(identify_pitches, pitch_arrays, args.repeat, batched=True),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="passes over each input set")
+    parser.add_argument("--min-notes", type=int, default=3)
+    parser.add_argument("--max-notes", type=int, default=6)
+    report.add_arguments(parser, "engines.json")
+    args = parser.parse_args()
+
+    results = run(args)
+    config = {"repeat": args.repeat, "min_notes": args.min_notes, "max_notes": args.max_notes}
+    report.finish(args, "engines", results, config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Micro-benchmark for chords.identify_chord.
+
+Compares the precomputed pitch-class index against the original
+roots x chord-types scan (kept below as `legacy_identify_chord`) and checks
+that both produce identical output for every 3 to 6 note combination.
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_identify
+"""
+import argparse
+import itertools
+import time
+from typing import Callable, Dict, List
+
+from chords import CHORD_DEFINITIONS, NOTES, get_intervals, get_note_index, identify_chord
+
+
+def legacy_identify_chord(notes: List[str]) -> Dict:
+    unique_notes = list(set(notes))
+    if len(unique_notes) < 3:
+        return {"found": False, "message": "Select at least 3 unique notes."}
+
+    note_indices = {get_note_index(n) for n in unique_notes}
+    if -1 in note_indices:
+        return {"found": False, "message": "Invalid notes provided."}
+
+    candidates = []
+    for potential_root_idx in note_indices:
+        current_intervals = get_intervals(potential_root_idx, note_indices)
+        for chord_name, required_intervals in CHORD_DEFINITIONS.items():
+            if current_intervals == required_intervals:
+                root_name = NOTES[potential_root_idx]
+                candidates.append({
+                    "root": root_name,
+                    "chord": chord_name,
+                    "name": f"{root_name} {chord_name}",
+                    "bass": notes[0] if notes else "",
+                })
+
+    if not candidates:
+        return {"found": False, "message": "No specific chord found for these notes."}
+
+    lowest_note = notes[0]
+    root_position_matches = [c for c in candidates if c['root'] == lowest_note]
+    other_matches = [c for c in candidates if c['root'] != lowest_note]
+
+    if root_position_matches:
+        primary_match = root_position_matches[0]
+        sorted_candidates = root_position_matches[1:] + other_matches
+    else:
+        primary_match = candidates[0]
+        primary_match["name"] = f"{primary_match['name']}/{lowest_note}"
+        sorted_candidates = candidates[1:]
+
+    return {"found": True, "primary": primary_match, "alternatives": sorted_candidates}
+
+
+def note_sets(min_size: int = 3, max_size: int = 6) -> List[List[str]]:
+    """Every pitch-class combination, plus each one rotated so every note gets a turn as bass."""
+    sets = []
+    for size in range(min_size, max_size + 1):
+        for combo in itertools.combinations(NOTES, size):
+            for shift in range(size):
+                sets.append(list(combo[shift:] + combo[:shift]))
+    return sets
+
+
+def time_per_call(fn: Callable[[List[str]], Dict], inputs: List[List[str]], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for notes in inputs:
+            fn(notes)
+        best = min(best, time.perf_counter() - start)
+    return best / len(inputs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    inputs = note_sets()
+    mismatches = [notes for notes in inputs if identify_chord(notes) != legacy_identify_chord(notes)]
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} outputs differ, e.g. {mismatches[0]}")
+
+    legacy = time_per_call(legacy_identify_chord, inputs, args.repeat)
+    indexed = time_per_call(identify_chord, inputs, args.repeat)
+    print(f"inputs:  {len(inputs)} note sets (3-6 notes, every bass), outputs identical")
+    print(f"legacy:  {legacy * 1e6:8.2f} us/call")
+    print(f"indexed: {indexed * 1e6:8.2f} us/call")
+    print(f"speedup: {legacy / indexed:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Checks that chord endpoints stay fast while LLM calls are in flight.
+
+Starts a fake OpenAI-compatible server that takes `--llm-delay` seconds per
+reply, points the app at it, then measures /api/identify latency first on an
+idle app and again while `--llm-requests` /api/llm/ask calls (half of them
+streaming) are waiting upstream. Fails if the in-flight p99 exceeds the budget.
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_llm_concurrency
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import List
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+QUESTION = {"messages": [{"role": "user", "content": "How do I use a half-diminished seventh chord in a pop song?"}]}
+CHORD = {"notes": ["G#", "B", "D", "F"]}
+
+
+async def chord_latencies(client: httpx.AsyncClient, count: int) -> List[float]:
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.post("/api/identify", json=CHORD)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(args: argparse.Namespace) -> None:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=None) as client:
+        idle = await chord_latencies(client, args.chord_requests)
+
+        start = time.perf_counter()
+        llm_calls = [
+            asyncio.create_task(client.post("/api/llm/ask/stream" if i % 2 else "/api/llm/ask", json=QUESTION))
+            for i in range(args.llm_requests)
+        ]
+        await asyncio.sleep(0.05)  # let the LLM calls reach the upstream
+        busy = await chord_latencies(client, args.chord_requests)
+        chords_done = time.perf_counter() - start
+        responses = await asyncio.gather(*llm_calls)
+        llm_done = time.perf_counter() - start
+
+    for response in responses:
+        response.raise_for_status()
+
+    idle_ms = np.array(idle) * 1e3
+    busy_ms = np.array(busy) * 1e3
+    print(f"llm:         {args.llm_requests} calls x {args.llm_delay}s upstream, all done after {llm_done:.2f}s")
+    print(f"chords idle: p50 {np.percentile(idle_ms, 50):.2f} ms, p99 {np.percentile(idle_ms, 99):.2f} ms")
+    print(f"chords busy: p50 {np.percentile(busy_ms, 50):.2f} ms, p99 {np.percentile(busy_ms, 99):.2f} ms "
+          f"({args.chord_requests} calls finished after {chords_done:.2f}s)")
+
+    if chords_done >= llm_done:
+        raise SystemExit("chord requests did not finish before the LLM calls; the event loop is blocked")
+    if np.percentile(busy_ms, 99) > args.max_p99_ms:
+        raise SystemExit(f"chord p99 while LLM calls are in flight exceeds {args.max_p99_ms} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-delay", type=float, default=2.0)
+    parser.add_argument("--llm-requests", type=int, default=8)
+    parser.add_argument("--chord-requests", type=int, default=200)
+    parser.add_argument("--max-p99-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(delay=args.llm_delay) as server:
+        os.environ["AZURE_OPENAI_ENDPOINT"] = server.url
+        os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"] = "fake-deployment"
+        os.environ["AZURE_OPENAI_API_KEY"] = "fake-key"
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+In-process load harness for every route of the FastAPI app.
+
+Requests go straight into the ASGI app (httpx.ASGITransport for HTTP, a
+minimal ASGI driver for WebSockets), so results measure the app and not
+the network stack. LLM routes talk to a local fake OpenAI-compatible server
+that answers after `--llm-delay` seconds. Each question is unique, so the
+response cache doesn't hide the upstream call.
+
+Each scenario sends `--requests` requests from `--concurrency` concurrent
+workers. The harness refuses to run if the app has a route with no
+scenario, so new endpoints have to be added here.
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_load --output bench-load.json
+    uv run python -m benchmarks.bench_load --concurrency 64 --baseline   # compare against baselines/load.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Union
+
+import httpx
+import numpy as np
+
+from benchmarks import report
+from benchmarks.fake_openai import FakeOpenAIServer
+
+SAMPLE_RATE = 44100
+TUNER_FRAMES = 8
+TUNER_FRAME_SIZE = 2048
+CHORD_STREAM_SECONDS = 2.0
+
+Call = Callable[[httpx.AsyncClient, int], Awaitable[None]]
+
+
+class Scenario(NamedTuple):
+    name: str
+    route: str  # The route path as registered, used for the coverage check
+    call: Call
+
+
+def question(scenario: str, i: int) -> str:
+    return f"Question {i} from {scenario}: which scale fits a minor ii-V-i?"
+
+
+def sine(hz: float, seconds: float) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (0.5 * np.sin(2 * np.pi * hz * t)).astype("<f4")
+
+
+async def websocket_session(app, path: str, frames: List[Union[bytes, str]], replies: Optional[int]) -> None:
+    """
+    Connects to a WebSocket route through ASGI, sends binary or text frames, waits
+    for `replies` text messages (or none if None), then disconnects.
+    """
+    inbound: asyncio.Queue = asyncio.Queue()
+    received = 0
+    enough = asyncio.Event()
+    accepted = asyncio.Event()
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "websocket.accept":
+            accepted.set()
+        elif message["type"] == "websocket.send":
+            received += 1
+            if replies is not None and received >= replies:
+                enough.set()
+        elif message["type"] == "websocket.close":
+            raise RuntimeError(f"{path} closed the connection: {message}")
+
+    scope = {
+        "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": path, "raw_path": path.encode(),
+        "query_string": f"sample_rate={SAMPLE_RATE}".encode(), "root_path": "", "headers": [(b"host", b"app")],
+        "client": ("127.0.0.1", 1), "server": ("app", 80), "subprotocols": [],
+    }
+    await inbound.put({"type": "websocket.connect"})
+    task = asyncio.create_task(app(scope, inbound.get, send))
+    await accepted.wait()
+    for frame in frames:
+        await inbound.put({"type": "websocket.receive", "bytes" if isinstance(frame, bytes) else "text": frame})
+    if replies is None:
+        while not inbound.empty():
+            await asyncio.sleep(0)
+    else:
+        await enough.wait()
+    await inbound.put({"type": "websocket.disconnect", "code": 1000})
+    await task
+
+
+def scenarios(app, paths: set) -> List[Scenario]:
+    frame_bytes = TUNER_FRAME_SIZE * 4
+    tone = sine(110.0, TUNER_FRAME_SIZE * TUNER_FRAMES / SAMPLE_RATE).tobytes()
+    tuner_frames = [tone[i:i + frame_bytes] for i in range(0, len(tone), frame_bytes)]
+    strum = sum(sine(hz, CHORD_STREAM_SECONDS) for hz in (130.81, 164.81, 196.00)) / 3
+    strum_chunks = [strum[i:i + 4096].tobytes() for i in range(0, len(strum), 4096)]
+    pitches = np.geomspace(40.0, 1400.0, 1024)
+    batch = [{"notes": ["C", "E", "G"]}, {"notes": ["A", "C", "E", "G"]}, {"notes": ["G#", "B", "D", "F"]}] * 32
+    c_major = [{"string": string, "fret": fret} for string, fret in enumerate([-1, 3, 2, 0, 1, 0]) if fret >= 0]
+    roots = ["C", "D", "E", "F", "G", "A", "B"]
+    modes = ["Major", "Dorian", "Phrygian", "Lydian", "Mixolydian", "Minor", "Locrian"]
+    song = ["C Major", "A Dominant 7th", "D Minor", "G Dominant 7th", "C Major", "F Minor", "C Major", ["E", "G", "C"]] * 4
+    created: List[str] = []  # Session ids, consumed by the delete scenario
+
+    def get(path: Callable[[int], str], **kwargs) -> Call:
+        async def call(client: httpx.AsyncClient, i: int) -> None:
+            response = await client.get(path(i), **kwargs)
+            response.raise_for_status()
+        return call
+
+    def get_missing(path: Callable[[int], str]) -> Call:
+        async def call(client: httpx.AsyncClient, i: int) -> None:
+            response = await client.get(path(i))
+            if response.status_code != 404:
+                response.raise_for_status()
+        return call
+
+    def post(path: Callable[[int], str], body: Callable[[int], object]) -> Call:
+        async def call(client: httpx.AsyncClient, i: int) -> None:
+            response = await client.post(path(i), json=body(i))
+            response.raise_for_status()
+        return call
+
+    def stream(path: Callable[[int], str], body: Callable[[int], object]) -> Call:
+        async def call(client: httpx.AsyncClient, i: int) -> None:
+            async with client.stream("POST", path(i), json=body(i)) as response:
+                response.raise_for_status()
+                async for _ in response.aiter_bytes():
+                    pass
+        return call
+
+    async def create_session(client: httpx.AsyncClient, i: int) -> None:
+        response = await client.post("/api/llm/sessions", json={"messages": [{"role": "system", "content": "Be brief."}]})
+        response.raise_for_status()
+        created.append(response.json()["session_id"])
+
+    async def delete_session(client: httpx.AsyncClient, i: int) -> None:
+        response = await client.delete(f"/api/llm/sessions/{created.pop()}")
+        response.raise_for_status()
+
+    async def octet_batch(client: httpx.AsyncClient, i: int) -> None:
+        response = await client.post(
+            "/api/tuner/analyze/batch", content=pitches.astype("<f4").tobytes(),
+            headers={"content-type": "application/octet-stream", "accept": "application/octet-stream"},
+        )
+        response.raise_for_status()
+
+    async def tuner_stream(client: httpx.AsyncClient, i: int) -> None:
+        await websocket_session(app, "/api/tuner/stream", tuner_frames, replies=len(tuner_frames))
+
+    async def progression_stream(client: httpx.AsyncClient, i: int) -> None:
+        await websocket_session(app, "/api/progression/stream", [json.dumps(chord) for chord in song], replies=len(song))
+
+    async def chords_stream(client: httpx.AsyncClient, i: int) -> None:
+        await websocket_session(app, "/api/chords/stream", strum_chunks, replies=None)
+
+    fixed = lambda value: lambda i: value
+    session = lambda suffix="": lambda i: f"/api/llm/sessions/{created[i % len(created)]}{suffix}"
+    ask_body = lambda scenario: lambda i: {"messages": [{"role": "user", "content": question(scenario, i)}]}
+    session_body = lambda scenario: lambda i: {"content": question(scenario, i)}
+
+    # Sessions are created before they are read, asked and finally deleted
+    result = [
+        Scenario("health", "/api/health", get(fixed("/api/health"))),
+        Scenario("identify", "/api/identify", post(fixed("/api/identify"), fixed({"notes": ["G", "B", "D", "F"]}))),
+        Scenario("identify_batch", "/api/identify/batch", post(fixed("/api/identify/batch"), fixed(batch))),
+        Scenario("identify_batch_stream", "/api/identify/batch", stream(fixed("/api/identify/batch?stream=true"), fixed(batch))),
+        Scenario("identify_fuzzy", "/api/identify/fuzzy", post(fixed("/api/identify/fuzzy"), fixed({"notes": ["C", "E", "A#", "D"]}))),
+        Scenario("identify_shape", "/api/identify/shape", post(fixed("/api/identify/shape"), fixed({"positions": c_major}))),
+        Scenario("progression_analyze", "/api/progression/analyze", post(fixed("/api/progression/analyze"), fixed({"chords": song}))),
+        Scenario("progression_stream", "/api/progression/stream", progression_stream),
+        Scenario("scales", "/api/scales", get(fixed("/api/scales"))),
+        Scenario("scale", "/api/scale/{scale_name}", get(lambda i: f"/api/scale/{roots[i % 7]} {modes[i % 7]}")),
+        Scenario("scales_containing", "/api/scales/containing", post(fixed("/api/scales/containing"), fixed({"notes": ["A", "C", "E", "F#"]}))),
+        Scenario("chords", "/api/chords", get(fixed("/api/chords"))),
+        Scenario("chords_notes", "/api/chords/notes", get(fixed("/api/chords/notes"), headers={"accept-encoding": "br, gzip"})),
+        Scenario("chord", "/api/chord/{chord_name}", get(lambda i: f"/api/chord/{roots[i % 7]} Minor 7th")),
+        Scenario("chord_voicings", "/api/chord/{chord_name}/voicings", get(lambda i: f"/api/chord/{roots[i % 7]} Major/voicings?capo={i % 3}")),
+        Scenario("chord_audio", "/api/chord/{chord_name}/audio", get(lambda i: f"/api/chord/{roots[i % 7]} Major/audio?format={('wav', 'ogg')[i % 2]}")),
+        Scenario("progression_audio", "/api/progression/audio",
+                 post(fixed("/api/progression/audio"), fixed({"chords": [c for c in song if isinstance(c, str)][:8], "tempo": 240}))),
+        Scenario("tuner_analyze", "/api/tuner/analyze", get(lambda i: f"/api/tuner/analyze?hz={110 + i % 400}")),
+        Scenario("tuner_batch_json", "/api/tuner/analyze/batch", post(fixed("/api/tuner/analyze/batch"), fixed(pitches.tolist()))),
+        Scenario("tuner_batch_octet", "/api/tuner/analyze/batch", octet_batch),
+        Scenario("tuner_stream", "/api/tuner/stream", tuner_stream),
+        Scenario("chords_stream", "/api/chords/stream", chords_stream),
+        Scenario("llm_ask", "/api/llm/ask", post(fixed("/api/llm/ask"), ask_body("ask"))),
+        Scenario("llm_ask_stream", "/api/llm/ask/stream", stream(fixed("/api/llm/ask/stream"), ask_body("ask_stream"))),
+        Scenario("session_create", "/api/llm/sessions", create_session),
+        Scenario("session_get", "/api/llm/sessions/{session_id}", get(session())),
+        Scenario("session_ask", "/api/llm/sessions/{session_id}/ask", post(session("/ask"), session_body("session_ask"))),
+        Scenario("session_ask_stream", "/api/llm/sessions/{session_id}/ask/stream", stream(session("/ask/stream"), session_body("session_ask_stream"))),
+        Scenario("session_delete", "/api/llm/sessions/{session_id}", delete_session),
+        Scenario("llm_cache_stats", "/api/llm/cache/stats", get(fixed("/api/llm/cache/stats"))),
+        Scenario("metrics", "/metrics", get(fixed("/metrics"))),
+    ]
+    if "/api/debug/profiles/{profile_id}" in paths:
+        result.append(Scenario("profile_missing", "/api/debug/profiles/{profile_id}", get_missing(fixed("/api/debug/profiles/none"))))
+    if "/{full_path:path}" in paths:
+        result.append(Scenario("static_index", "/{full_path:path}", get(fixed("/"), headers={"accept-encoding": "br, gzip"})))
+    return result
+
+
+def app_routes(app) -> set:
+    from fastapi.routing import APIRoute, APIWebSocketRoute
+
+    return {route.path for route in app.routes if isinstance(route, (APIRoute, APIWebSocketRoute))}
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> Dict[str, float]:
+    counter = itertools.count()
+    latencies: List[float] = []
+
+    async def worker() -> None:
+        for i in counter:
+            if i >= requests:
+                return
+            start = time.perf_counter()
+            await scenario.call(client, i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return report.summarize(latencies, time.perf_counter() - start)
+
+
+async def run(args: argparse.Namespace) -> report.Results:
+    from main import app
+
+    paths = app_routes(app)
+    selected = scenarios(app, paths)
+    missing = paths - {scenario.route for scenario in selected}
+    if missing:
+        raise SystemExit(f"routes without a load scenario: {sorted(missing)}")
+    if args.only:
+        names = set(args.only.split(","))
+        selected = [scenario for scenario in selected if scenario.name in names]
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=None) as client:
+        for scenario in selected:
+            await run_scenario(client, scenario, args.warmup, min(args.warmup, args.concurrency) or 1)
+            results[scenario.name] = await run_scenario(client, scenario, args.requests, args.concurrency)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="fake upstream seconds per reply")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    report.add_arguments(parser, "load.json")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(delay=args.llm_delay) as server:
+        os.environ["AZURE_OPENAI_ENDPOINT"] = server.url
+        os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"] = "fake-deployment"
+        os.environ["AZURE_OPENAI_API_KEY"] = "fake-key"
+        os.environ["LLM_PROVIDER"] = "azure"
+        results = asyncio.run(run(args))
+
+    config = {"concurrency": args.concurrency, "requests": args.requests, "llm_delay": args.llm_delay}
+    report.finish(args, "load", results, config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Import-to-first-byte benchmark for worker cold starts.
+
+Each run is a fresh interpreter that imports `main` and then drives the
+ASGI app directly (no HTTP client, so nothing extra gets imported) until the
+first response byte of the chord and tuner endpoints. "lazy" is the default
+startup; "eager" also builds the Azure OpenAI provider at import time, the
+way the app used to.
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_startup
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = r'''
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+if sys.argv[1] == "eager":
+    import llm
+    llm.get_provider()
+imported = time.perf_counter()
+
+async def first_byte(method, path, query=b"", body=b""):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query, "root_path": "",
+             "headers": [(b"host", b"app"), (b"content-type", b"application/json")], "client": ("127.0.0.1", 1),
+             "server": ("app", 80)}
+    received = False
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.sleep(3600)
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+    done = asyncio.get_running_loop().create_future()
+    async def send(message):
+        if message["type"] == "http.response.body" and not done.done():
+            done.set_result(time.perf_counter())
+    task = asyncio.create_task(main.app(scope, receive, send))
+    result = await done
+    await task
+    return result
+
+async def run():
+    identify = await first_byte("POST", "/api/identify", body=b'{"notes": ["C", "E", "G"]}')
+    tuner = await first_byte("GET", "/api/tuner/analyze", query=b"hz=440")
+    return identify, tuner
+
+identify, tuner = asyncio.run(run())
+print(json.dumps({
+    "import_ms": (imported - start) * 1e3,
+    "identify_first_byte_ms": (identify - start) * 1e3,
+    "tuner_first_byte_ms": (tuner - start) * 1e3,
+    "llm_stack_loaded": "openai" in sys.modules,
+}))
+'''
+
+
+def probe(mode: str) -> dict:
+    env = dict(os.environ)
+    env.update(
+        AZURE_OPENAI_ENDPOINT="http://127.0.0.1:9",
+        AZURE_OPENAI_DEPLOYMENT_NAME="startup-bench",
+        AZURE_OPENAI_API_KEY="startup-bench",
+        LLM_PROVIDER="azure",
+    )
+    output = subprocess.run([sys.executable, "-c", PROBE, mode], env=env, check=True, capture_output=True, text=True)
+    return json.loads(output.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    probe("lazy")  # warm the filesystem cache and .pyc files
+    for mode in ("lazy", "eager"):
+        runs = [probe(mode) for _ in range(args.runs)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0] if key.endswith("_ms")}
+        print(
+            f"{mode:5}  import {median['import_ms']:7.1f} ms   "
+            f"/api/identify first byte {median['identify_first_byte_ms']:7.1f} ms   "
+            f"/api/tuner/analyze first byte {median['tuner_first_byte_ms']:7.1f} ms   "
+            f"(LLM stack loaded: {runs[0]['llm_stack_loaded']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
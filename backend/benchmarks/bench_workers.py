@@ -0,0 +1,243 @@
+"""
+Throughput and memory of the real server as uvicorn workers are added.
+
+For each worker count, starts `uvicorn main:app --workers N` on a free
+local port and drives it over HTTP with `--clients` client processes, each
+holding `--connections` keep-alive connections, for `--seconds`. The request
+mix is the CPU-bound chord engine (identify, fuzzy match, fretboard shape,
+progression analysis, scales, voicings), which is what extra cores help.
+
+Alongside throughput it reports, from /proc, each worker's private memory
+and the whole server's proportional set size (PSS), plus the table file's
+share: its pages are mapped by every worker but resident once, so "tables
+PSS" stays flat while worker count grows. `--without-tables` runs the same
+load with every worker building its own tables, for comparison.
+
+Clients share the machine with the server, so with C cores expect throughput
+to level off somewhat below C workers.
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_workers
+    uv run python -m benchmarks.bench_workers --workers 1,2,4,8 --seconds 10 --output bench-workers.json
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import tables
+from benchmarks import report
+
+C_MAJOR = [{"string": string, "fret": fret} for string, fret in enumerate([-1, 3, 2, 0, 1, 0]) if fret >= 0]
+SONG = ["C Major", "A Dominant 7th", "D Minor", "G Dominant 7th", "C Major", "F Minor", "C Major", ["E", "G", "C"]] * 4
+ROOTS = ["C", "D", "E", "F", "G", "A", "B"]
+
+# (method, path, JSON body); clients cycle through these in order
+REQUESTS = [
+    ("POST", "/api/identify", {"notes": ["G", "B", "D", "F"]}),
+    ("POST", "/api/identify/fuzzy", {"notes": ["C", "E", "A#", "D"]}),
+    ("POST", "/api/identify/shape", {"positions": C_MAJOR}),
+    ("POST", "/api/progression/analyze", {"chords": SONG}),
+    ("POST", "/api/scales/containing", {"notes": ["A", "C", "E", "F#"]}),
+    *[("GET", f"/api/chord/{root}%20Major/voicings?page_size=10", None) for root in ROOTS],
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory_kb(pid: int, mapping: Optional[str] = None) -> Dict[str, int]:
+    """
+    Rss, Pss and private kB of a process from /proc/<pid>/smaps (Linux), in
+    total or for the mappings of one file. Empty where /proc isn't available.
+    """
+    totals = {"rss": 0, "pss": 0, "private": 0}
+    try:
+        with open(f"/proc/{pid}/smaps") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    counting = mapping is None
+    for line in lines:
+        field, _, rest = line.partition(":")
+        if " " in field:  # A mapping's header line: "start-end perms ... path"
+            counting = mapping is None or line.endswith(mapping)
+        elif counting and field in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+            key = {"Rss": "rss", "Pss": "pss"}.get(field, "private")
+            totals[key] += int(rest.split()[0])
+    return totals
+
+
+class Server:
+    """A uvicorn process with N workers, stopped on exit."""
+
+    def __init__(self, workers: int, tables_path: str):
+        self.workers = workers
+        self.port = free_port()
+        env = dict(os.environ, TABLES_PATH=tables_path, LLM_PROVIDER="stub", PYTHONUNBUFFERED="1")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--workers", str(workers), "--log-level", "warning"],
+            env=env,
+        )
+
+    def __enter__(self) -> "Server":
+        deadline = time.monotonic() + 120
+        # A single worker serves from the main process; otherwise wait for every worker to be forked
+        while self.workers > 1 and len(children(self.process.pid)) < self.workers:
+            self.check(deadline)
+            time.sleep(0.1)
+        while not self.healthy():
+            self.check(deadline)
+            time.sleep(0.1)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+    def check(self, deadline: float) -> None:
+        if self.process.poll() is not None:
+            raise SystemExit(f"uvicorn exited with {self.process.returncode}")
+        if time.monotonic() > deadline:
+            raise SystemExit("uvicorn did not start within 120 s")
+
+    def healthy(self) -> bool:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=1)
+            connection.request("GET", "/api/health")
+            return connection.getresponse().status == 200
+        except OSError:
+            return False
+
+    def worker_pids(self) -> List[int]:
+        return children(self.process.pid) if self.workers > 1 else [self.process.pid]
+
+
+def client(port: int, connections: int, start: float, stop: float, offset: int) -> Tuple[List[float], int]:
+    """One client process: `connections` keep-alive connections sending REQUESTS until `stop`. Returns latencies after `start`."""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def connection_loop(i: int) -> None:
+        nonlocal errors
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        n = offset + i
+        own: List[float] = []
+        failed = 0
+        while True:
+            method, path, body = REQUESTS[n % len(REQUESTS)]
+            n += 1
+            sent = time.perf_counter()
+            if sent >= stop:
+                break
+            payload = json.dumps(body).encode() if body is not None else None
+            headers = {"content-type": "application/json"} if body is not None else {}
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                failed += 1
+            if sent >= start:
+                own.append(time.perf_counter() - sent)
+        connection.close()
+        with lock:
+            latencies.extend(own)
+            errors += failed
+
+    threads = [threading.Thread(target=connection_loop, args=(i,)) for i in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def run(server: Server, args: argparse.Namespace) -> Dict[str, float]:
+    start = time.perf_counter() + args.warmup
+    stop = start + args.seconds
+    with multiprocessing.Pool(args.clients) as pool:
+        runs = pool.starmap(client, [(server.port, args.connections, start, stop, c * args.connections) for c in range(args.clients)])
+    latencies = [latency for run_latencies, _ in runs for latency in run_latencies]
+    errors = sum(run_errors for _, run_errors in runs)
+    if errors:
+        raise SystemExit(f"{errors} requests failed with {server.workers} workers")
+    if not latencies:
+        raise SystemExit(f"no requests finished in the measured window with {server.workers} workers; try a longer --warmup")
+    return report.summarize(latencies, args.seconds)
+
+
+def ensure_table_file() -> str:
+    """The configured table file if it is current, else one built into a temporary directory."""
+    if tables.table_file is not None:
+        return tables.TABLES_PATH
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-workers-"), "tables.bin")
+    print(f"building {path} ...")
+    subprocess.run([sys.executable, "-m", "tables", path], check=True, capture_output=True)
+    return path
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *(n for n in (2, 4, 8, 16, 32) if n <= cpus), cpus})
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)), help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=cpus, help="client processes")
+    parser.add_argument("--connections", type=int, default=8, help="keep-alive connections per client process")
+    parser.add_argument("--seconds", type=float, default=5.0, help="measured seconds per worker count")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds before each measurement")
+    parser.add_argument("--without-tables", action="store_true", help="don't use a table file; every worker builds its own tables")
+    report.add_arguments(parser, None)  # Throughput depends on the core count, so there is no stored baseline
+    args = parser.parse_args()
+
+    tables_path = "" if args.without_tables else ensure_table_file()
+    results: Dict[str, Dict[str, float]] = {}
+    rows = []
+    for workers in (int(n) for n in args.workers.split(",")):
+        with Server(workers, tables_path) as server:
+            result = run(server, args)
+            pids = server.worker_pids()
+            memory = [memory_kb(pid) for pid in pids]
+            table_memory = [memory_kb(pid, tables_path) for pid in pids] if tables_path else []
+        results[f"workers_{workers}"] = result
+        rows.append((workers, result["ops_per_sec"], memory, table_memory))
+
+    base = rows[0][1] / rows[0][0]
+    print(f"{'workers':>7}  {'req/s':>9}  {'speedup':>7}  {'per worker':>10}  {'private MiB/worker':>18}  {'total PSS MiB':>13}  {'tables PSS MiB':>14}")
+    for workers, rate, memory, table_memory in rows:
+        private = sum(m.get("private", 0) for m in memory) / len(memory) / 1024
+        pss = sum(m.get("pss", 0) for m in memory) / 1024
+        table_pss = f"{sum(m.get('pss', 0) for m in table_memory) / 1024:14.1f}" if table_memory else f"{'-':>14}"
+        print(f"{workers:7d}  {rate:9.1f}  {rate / rows[0][1]:6.2f}x  {rate / workers / base:9.0%}  {private:18.1f}  {pss:13.1f}  {table_pss}")
+    print()
+
+    config = {
+        "cpus": cpus, "clients": args.clients, "connections": args.connections,
+        "seconds": args.seconds, "tables": not args.without_tables,
+    }
+    report.finish(args, "workers", results, config)
+
+
+if __name__ == "__main__":
+    main()
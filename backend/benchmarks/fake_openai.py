@@ -0,0 +1,93 @@
+"""
+A local OpenAI-compatible chat completions server for benchmarks.
+
+Answers both the Azure (`/openai/deployments/{name}/chat/completions`) and
+plain (`/v1/chat/completions`) routes after a configurable delay, streaming
+the reply word by word when `stream` is requested.
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+REPLY = "Try resolving the half-diminished chord to the dominant before landing on the tonic."
+
+
+def create_app(delay: float) -> FastAPI:
+    app = FastAPI()
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        created = int(time.time())
+        words = REPLY.split(" ")
+        usage = {"prompt_tokens": sum(len(m["content"].split()) for m in body["messages"]), "completion_tokens": len(words)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": REPLY}}],
+                "usage": usage,
+            }
+
+        async def chunks():
+            for i, word in enumerate(words):
+                await asyncio.sleep(delay / len(words))
+                chunk = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "finish_reason": None, "delta": {"content": word if i == 0 else " " + word}}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            if body.get("stream_options", {}).get("include_usage"):
+                chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created,
+                         "model": body.get("model", "fake"), "choices": [], "usage": usage}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    app.post("/openai/deployments/{deployment}/chat/completions")(chat_completions)
+    app.post("/v1/chat/completions")(chat_completions)
+    return app
+
+
+class FakeOpenAIServer:
+    """Runs the fake server on a free localhost port in a background thread."""
+
+    def __init__(self, delay: float = 1.0, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(create_app(delay), host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,95 @@
+"""
+Shared result format for the engine and load benchmarks.
+
+Each benchmark produces {name: {"ops", "ops_per_sec", "p50_ms", "p95_ms",
+"p99_ms", "max_ms"}} and writes it as JSON with `--output`. Passing a
+previous file as `--baseline` compares against it and exits non-zero when
+throughput drops, or p99 latency grows, by more than `--tolerance`.
+"""
+import argparse
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+Results = Dict[str, Dict[str, float]]
+
+
+def summarize(latencies: Sequence[float], elapsed: float, items: int = 0) -> Dict[str, float]:
+    """
+    Latencies and elapsed wall time are in seconds. `items` counts the work
+    done when a single timed call handles more than one (e.g. a batch);
+    it defaults to one item per call.
+    """
+    ms = np.asarray(latencies) * 1e3
+    items = items or len(ms)
+    return {
+        "ops": items,
+        "ops_per_sec": round(items / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser, default_baseline: Optional[str]) -> None:
+    """`default_baseline` is the stored file a bare `--baseline` uses; without one, `--baseline` needs a file."""
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    if default_baseline:
+        parser.add_argument("--baseline", type=Path, nargs="?", const=BASELINE_DIR / default_baseline,
+                            help=f"compare against a results file (default: baselines/{default_baseline})")
+    else:
+        parser.add_argument("--baseline", type=Path, help="compare against a results file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative throughput drop / p99 increase before failing")
+
+
+def compare(results: Results, baseline: Results, tolerance: float) -> List[str]:
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['ops_per_sec']:.0f} ops/s vs {previous['ops_per_sec']:.0f} baseline")
+        if current["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {current['p99_ms']:.3f} ms vs {previous['p99_ms']:.3f} ms baseline")
+    return regressions
+
+
+def finish(args: argparse.Namespace, benchmark: str, results: Results, config: Dict) -> None:
+    """Prints the results table, then writes and/or checks them as requested on the command line."""
+    width = max(len(name) for name in results)
+    print(f"{'':{width}}  {'ops/s':>12}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:{width}}  {r['ops_per_sec']:12.1f}  {r['p50_ms']:9.3f}  {r['p95_ms']:9.3f}  {r['p99_ms']:9.3f}")
+
+    # Read the baseline first, in case --output overwrites the same file
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+
+    if args.output:
+        report = {
+            "benchmark": benchmark,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "config": config,
+            "results": results,
+        }
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"wrote {args.output}")
+
+    if baseline:
+        if baseline.get("config") != config:
+            print(f"note: baseline was recorded with {baseline.get('config')}")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            raise SystemExit("regressions against baseline:\n  " + "\n  ".join(regressions))
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
@@ -1,4 +1,8 @@
-from typing import List, Dict, Optional, Tuple, Set
+from typing import List, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Set
+
+import numpy as np
+
+import tables
 
 # Notes in chromatic scale
 NOTES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
@@ -40,8 +44,61 @@ CHORD_DEFINITIONS = {
     "Minor Add9": frozenset([0, 3, 7, 2]),
     "Major 6th": frozenset([0, 4, 7, 9]),
     "Minor 6th": frozenset([0, 3, 7, 9]),
+    "Minor Major 7th": frozenset([0, 3, 7, 11]),
+    "Dominant 7th Sus4": frozenset([0, 5, 7, 10]),
+    # Extended chords (9 = 2, 11 = 5, 13 = 9 mod 12)
+    "Major 6/9": frozenset([0, 4, 7, 9, 2]),
+    "Dominant 9th": frozenset([0, 4, 7, 10, 2]),
+    "Major 9th": frozenset([0, 4, 7, 11, 2]),
+    "Minor 9th": frozenset([0, 3, 7, 10, 2]),
+    "Dominant 11th": frozenset([0, 4, 7, 10, 2, 5]),
+    "Minor 11th": frozenset([0, 3, 7, 10, 2, 5]),
+    "Major 7th #11": frozenset([0, 4, 7, 11, 6]), # Lydian
+    "Dominant 13th": frozenset([0, 4, 7, 10, 2, 9]), # 11th usually left out
+    "Major 13th": frozenset([0, 4, 7, 11, 2, 9]),
+    "Minor 13th": frozenset([0, 3, 7, 10, 2, 9]),
+    # Altered dominants
+    "Dominant 7th b5": frozenset([0, 4, 6, 10]),
+    "Dominant 7th #5": frozenset([0, 4, 8, 10]),
+    "Dominant 7th b9": frozenset([0, 4, 7, 10, 1]),
+    "Dominant 7th #9": frozenset([0, 4, 7, 10, 3]), # "Hendrix chord"
+    "Dominant 7th #11": frozenset([0, 4, 7, 10, 6]),
+    "Dominant 7th b13": frozenset([0, 4, 7, 10, 8]),
+    "Altered Dominant": frozenset([0, 4, 10, 1, 3, 6, 8]), # R 3 b7 b9 #9 #11 b13
+    # Omitted 5th, as commonly voiced on guitar
+    "Major 7th (no 5)": frozenset([0, 4, 11]),
+    "Minor 7th (no 5)": frozenset([0, 3, 10]),
+    "Dominant 7th (no 5)": frozenset([0, 4, 10]),
+    "Major 9th (no 5)": frozenset([0, 4, 11, 2]),
+    "Minor 9th (no 5)": frozenset([0, 3, 10, 2]),
+    "Dominant 9th (no 5)": frozenset([0, 4, 10, 2]),
+    "Dominant 13th (no 5)": frozenset([0, 4, 10, 9]),
+    "Dominant 7th #9 (no 5)": frozenset([0, 4, 10, 3]),
+}
+
+# The perfect fifth may be left out of a chord at a lower cost than other tones
+FIFTH = 7
+
+# Scale and mode definitions (intervals from the tonic)
+SCALE_DEFINITIONS = {
+    "Major": frozenset([0, 2, 4, 5, 7, 9, 11]), # Ionian
+    "Dorian": frozenset([0, 2, 3, 5, 7, 9, 10]),
+    "Phrygian": frozenset([0, 1, 3, 5, 7, 8, 10]),
+    "Lydian": frozenset([0, 2, 4, 6, 7, 9, 11]),
+    "Mixolydian": frozenset([0, 2, 4, 5, 7, 9, 10]),
+    "Minor": frozenset([0, 2, 3, 5, 7, 8, 10]), # Natural minor / Aeolian
+    "Locrian": frozenset([0, 1, 3, 5, 6, 8, 10]),
+    "Harmonic Minor": frozenset([0, 2, 3, 5, 7, 8, 11]),
+    "Melodic Minor": frozenset([0, 2, 3, 5, 7, 9, 11]), # Ascending form
+    "Major Pentatonic": frozenset([0, 2, 4, 7, 9]),
+    "Minor Pentatonic": frozenset([0, 3, 5, 7, 10]),
+    "Blues": frozenset([0, 3, 5, 6, 7, 10]),
+    "Whole Tone": frozenset([0, 2, 4, 6, 8, 10]),
+    "Diminished": frozenset([0, 1, 3, 4, 6, 7, 9, 10]), # Half-whole
 }
 
+SCALE_ALIASES = {"Ionian": "Major", "Aeolian": "Minor", "Natural Minor": "Minor"}
+
 def get_note_index(note: str) -> int:
     try:
         return NOTES.index(note)
@@ -59,44 +116,147 @@ def get_intervals(root_index: int, note_indices: Set[int]) -> Set[int]:
         intervals.add(interval)
     return intervals
 
-def identify_chord(notes: List[str]) -> Dict:
+def pitch_class_mask(note_indices: Iterable[int]) -> int:
+    """Encodes a set of pitch classes as a 12-bit mask (bit 0 = C)."""
+    mask = 0
+    for note_idx in note_indices:
+        mask |= 1 << (note_idx % 12)
+    return mask
+
+def rotate_mask(mask: int, semitones: int) -> int:
+    """Transposes a 12-bit pitch-class mask up by `semitones`."""
+    semitones %= 12
+    return ((mask << semitones) | (mask >> (12 - semitones))) & 0xFFF
+
+# (root_idx, root_name, chord_type, full_name) for a single chord match
+ChordMatch = Tuple[int, str, str, str]
+
+# Every (root, chord type) pair, with its 12-bit mask in the matching cell
+CHORD_MATCHES: List[List[ChordMatch]] = [
+    [(root_idx, root_name, chord_name, f"{root_name} {chord_name}") for chord_name in CHORD_DEFINITIONS]
+    for root_idx, root_name in enumerate(NOTES)
+]
+CHORD_MASK_MATRIX = np.array(
+    [
+        [rotate_mask(pitch_class_mask(intervals), root_idx) for intervals in CHORD_DEFINITIONS.values()]
+        for root_idx in range(len(NOTES))
+    ],
+    dtype=np.uint16,
+)
+
+def build_chord_index() -> List[Tuple[ChordMatch, ...]]:
     """
-    Identifies chords from a list of note names.
-    Returns a dictionary with the primary match and candidates.
+    Builds a 4096-entry table mapping every pitch-class mask to the chords it
+    spells exactly, covering all 12 roots of every entry in CHORD_DEFINITIONS.
+    Matches within an entry are ordered by root, then by definition order.
+    """
+    index: List[List[ChordMatch]] = [[] for _ in range(1 << 12)]
+    for root_idx, row in enumerate(CHORD_MATCHES):
+        for type_idx, match in enumerate(row):
+            index[int(CHORD_MASK_MATRIX[root_idx, type_idx])].append(match)
+    return [tuple(matches) for matches in index]
+
+CHORD_INDEX = build_chord_index()
+
+# (key, scale type) scales as 12-bit masks, like CHORD_MASK_MATRIX
+SCALE_TYPES = list(SCALE_DEFINITIONS)
+SCALE_NAMES = [f"{NOTES[key_idx]} {scale_type}" for key_idx in range(len(NOTES)) for scale_type in SCALE_TYPES]
+SCALE_MASK_MATRIX = np.array(
+    [
+        [rotate_mask(pitch_class_mask(intervals), key_idx) for intervals in SCALE_DEFINITIONS.values()]
+        for key_idx in range(len(NOTES))
+    ],
+    dtype=np.uint16,
+)
+
+# Which chords fit which scales: SCALE_CHORD_MATRIX[key, scale type, root, chord type]
+# is True when every chord tone is in the scale (chord mask is a subset of the scale mask)
+SCALE_CHORD_MATRIX = (
+    CHORD_MASK_MATRIX[None, None, :, :] & ~SCALE_MASK_MATRIX[:, :, None, None]
+) == 0
+
+def build_scale_chords() -> List[List[Tuple[ChordMatch, ...]]]:
+    """
+    For every (key, scale type), the chords that fit it, ordered by the
+    root's distance above the key (so by scale degree), then definition order.
+    """
+    table = []
+    for key_idx in range(len(NOTES)):
+        row = []
+        for scale_idx in range(len(SCALE_TYPES)):
+            roots, types = np.nonzero(SCALE_CHORD_MATRIX[key_idx, scale_idx])
+            order = np.lexsort((types, (roots - key_idx) % 12))
+            row.append(tuple(CHORD_MATCHES[roots[i]][types[i]] for i in order))
+        table.append(row)
+    return table
+
+def build_scale_index() -> List[Tuple[int, ...]]:
+    """
+    Maps every pitch-class mask to the ids (key * scale types + scale type) of
+    the scales containing it, smallest scales first, then definition order, then key.
+    """
+    masks = np.arange(1 << 12)[:, None]
+    scale_masks = SCALE_MASK_MATRIX.reshape(-1).astype(np.int64)
+    contains = (masks & ~scale_masks) == 0  # (4096, keys * scale types)
+    sizes = np.array([len(intervals) for intervals in SCALE_DEFINITIONS.values()] * len(NOTES))
+    scale_ids = np.arange(len(scale_masks))
+    order = np.lexsort((scale_ids // len(SCALE_TYPES), scale_ids % len(SCALE_TYPES), sizes))
+    return [tuple(int(i) for i in order[row[order]]) for row in contains]
+
+SCALE_CHORDS = build_scale_chords()
+SCALE_INDEX = build_scale_index()
+
+def parse_note_set(notes: List[str]) -> Tuple[Set[int], Optional[Dict]]:
+    """
+    Validates a note list and returns its pitch classes, or an error
+    response when the notes cannot form a chord.
     """
     unique_notes = list(set(notes))
     if len(unique_notes) < 3:
-        return {"found": False, "message": "Select at least 3 unique notes."}
+        return set(), {"found": False, "message": "Select at least 3 unique notes."}
 
     note_indices = {get_note_index(n) for n in unique_notes}
     if -1 in note_indices:
-         return {"found": False, "message": "Invalid notes provided."}
-
-    candidates = []
-
-    # Try every note as the root
-    for potential_root_idx in note_indices:
-        current_intervals = get_intervals(potential_root_idx, note_indices)
-
-        for chord_name, required_intervals in CHORD_DEFINITIONS.items():
-            # Check if required intervals match the current intervals
-            # Note: The set of notes from user might contain *more* notes or be exact.
-            # For this simple app, we look for exact matches of chord tones.
-            # However, prompt says "don't need to consider chords with more than 4 unique notes"
-            # and "support all 3 and 4-note chord combinations".
-
-            if current_intervals == required_intervals:
-                root_name = NOTES[potential_root_idx]
-                candidates.append({
-                    "root": root_name,
-                    "chord": chord_name,
-                    "name": f"{root_name} {chord_name}",
-                    "bass": notes[0] if notes else "" # Assumes input list is ordered by pitch if strictly checking bass for inversions, but here we just store candidates first.
-                })
-
-    if not candidates:
+         return note_indices, {"found": False, "message": "Invalid notes provided."}
+
+    return note_indices, None
+
+def identify_chord(notes: List[str]) -> Dict:
+    """
+    Identifies chords from a list of note names.
+    Returns a dictionary with the primary match and candidates.
+    """
+    note_indices, error = parse_note_set(notes)
+    if error:
+        return error
+
+    # Every rotation of every chord type was indexed at import time, so the
+    # candidates for this pitch-class set are a single table lookup.
+    return rank_matches(notes, note_indices, CHORD_INDEX[pitch_class_mask(note_indices)])
+
+def rank_matches(notes: List[str], note_indices: Set[int], matches: Sequence[ChordMatch]) -> Dict:
+    """
+    Builds the identify_chord response for the exact matches of a note set,
+    preferring the candidate whose root is the bass note.
+    """
+    if not matches:
         return {"found": False, "message": "No specific chord found for these notes."}
 
+    if len(matches) > 1:
+        # Candidates are reported in the order the note set iterates its roots
+        order = list(note_indices)
+        matches = sorted(matches, key=lambda match: order.index(match[0]))
+
+    candidates = [
+        {
+            "root": root_name,
+            "chord": chord_name,
+            "name": full_name,
+            "bass": notes[0] if notes else "" # Assumes input list is ordered by pitch if strictly checking bass for inversions, but here we just store candidates first.
+        }
+        for _, root_name, chord_name, full_name in matches
+    ]
+
     # Sort candidates.
     # Logic: "preferentially identify the chord whose bass note corresponds to the lowest note on the fretboard"
     # The input `notes` list comes from the frontend. We will assume the frontend sends them ordered
@@ -136,13 +296,105 @@ def identify_chord(notes: List[str]) -> Dict:
         "alternatives": sorted_candidates
     }
 
-def get_chord_notes(chord_name: str) -> List[str]:
+# Fuzzy matching: a chord's distance from a note set is the popcount of the
+# chord tones it lacks (2 each, or 1 for the fifth) plus the notes it
+# doesn't explain (2 each). Distances from every 12-bit set to every
+# (root, chord type) are precomputed, along with the closest candidates.
+MISSING_TONE_COST = 2
+MISSING_FIFTH_COST = 1
+EXTRA_TONE_COST = 2
+FUZZY_CANDIDATES = 16
+
+POPCOUNT = np.array([bin(mask).count("1") for mask in range(1 << 12)], dtype=np.uint8)
+
+def build_fuzzy_table(candidates: int = FUZZY_CANDIDATES) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Reverse lookup: 'C Major' -> ['C', 'E', 'G']
+    Returns (order, cost): for every input mask, the flat (root * types + type)
+    ids of its closest chords, best first, and their distances.
+    """
+    chord_masks = CHORD_MASK_MATRIX.reshape(-1).astype(np.int64)
+    roots = np.repeat(np.arange(len(NOTES)), len(CHORD_DEFINITIONS))
+    fifths = np.array([1 << ((root + FIFTH) % 12) for root in roots]) & chord_masks
+    masks = np.arange(1 << 12)[:, None]
+
+    missing = chord_masks & ~masks
+    cost = (
+        MISSING_TONE_COST * POPCOUNT[missing & ~fifths].astype(np.int16)
+        + MISSING_FIFTH_COST * POPCOUNT[missing & fifths]
+        + EXTRA_TONE_COST * POPCOUNT[masks & ~chord_masks & 0xFFF]
+    )
+    # Ties go to the chord with fewer tones, then to definition order
+    tie_break = POPCOUNT[chord_masks].astype(np.int32)
+    order = np.lexsort((np.broadcast_to(tie_break, cost.shape), cost), axis=-1)[:, :candidates]
+    return order.astype(np.int16), np.take_along_axis(cost, order, axis=-1).astype(np.uint8)
+
+FUZZY_ORDER, FUZZY_COST = tables.load(("fuzzy_order", "fuzzy_cost"), build_fuzzy_table)
+
+def match_chords(notes: List[str], limit: int = 5) -> Dict:
+    """
+    Ranks the closest chords to a note set, even when no chord matches exactly.
+    Each candidate lists the chord tones missing from the notes and the notes
+    that aren't chord tones; exact matches have distance 0. Among equally close
+    chords, the one rooted on the bass note (notes[0]) comes first.
+    """
+    note_indices = {get_note_index(n) for n in notes}
+    if -1 in note_indices:
+        return {"found": False, "message": "Invalid notes provided."}
+    if len(note_indices) < 2:
+        return {"found": False, "message": "Select at least 2 unique notes."}
+
+    mask = pitch_class_mask(note_indices)
+    bass_idx = get_note_index(notes[0])
+    type_count = len(CHORD_DEFINITIONS)
+    ranked = sorted(
+        zip(FUZZY_ORDER[mask].tolist(), FUZZY_COST[mask].tolist()),
+        key=lambda candidate: (candidate[1], candidate[0] // type_count != bass_idx),
+    )[:limit]
+
+    matches = []
+    for chord_id, cost in ranked:
+        root_idx, root_name, chord_name, full_name = CHORD_MATCHES[chord_id // type_count][chord_id % type_count]
+        chord_mask = int(CHORD_MASK_MATRIX[root_idx, chord_id % type_count])
+        matches.append({
+            "root": root_name,
+            "chord": chord_name,
+            "name": full_name,
+            "distance": cost,
+            "missing": [NOTES[i] for i in range(12) if (chord_mask & ~mask) >> i & 1],
+            "extra": [NOTES[i] for i in range(12) if (mask & ~chord_mask) >> i & 1],
+        })
+    return {"found": True, "matches": matches}
+
+def iter_identify_chunks(note_lists: Iterable[List[str]], chunk_size: int = 1024) -> Iterator[List[Dict]]:
+    """
+    Identifies many note lists, yielding identify_chord results a chunk at a
+    time in input order, so a streaming caller can write each chunk at once.
+    """
+    chunk: List[List[str]] = []
+    for notes in note_lists:
+        chunk.append(notes)
+        if len(chunk) == chunk_size:
+            yield _identify_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield _identify_chunk(chunk)
+
+def identify_chords(note_lists: Iterable[List[str]]) -> List[Dict]:
+    return [result for chunk in iter_identify_chunks(note_lists) for result in chunk]
+
+def _identify_chunk(note_lists: List[List[str]]) -> List[Dict]:
+    # Each item's candidates are one CHORD_INDEX lookup by its mask; comparing
+    # a chunk against every (root, chord type) mask in NumPy and walking the
+    # hits back out in Python measured slower than that.
+    return [identify_chord(notes) for notes in note_lists]
+
+def parse_chord_name(chord_name: str) -> Optional[Tuple[int, str]]:
+    """
+    'C Major' -> (0, 'Major'), or None if the root or chord type is unknown.
     """
     parts = chord_name.split(" ", 1)
     if len(parts) < 2:
-        return []
+        return None
 
     root_str = parts[0]
     type_str = parts[1]
@@ -153,8 +405,19 @@ def get_chord_notes(chord_name: str) -> List[str]:
 
     root_idx = get_note_index(root_str)
     if root_idx == -1 or type_str not in CHORD_DEFINITIONS:
+        return None
+
+    return root_idx, type_str
+
+def get_chord_notes(chord_name: str) -> List[str]:
+    """
+    Reverse lookup: 'C Major' -> ['C', 'E', 'G']
+    """
+    parsed = parse_chord_name(chord_name)
+    if not parsed:
         return []
 
+    root_idx, type_str = parsed
     intervals = CHORD_DEFINITIONS[type_str]
     note_names = []
     for interval in intervals:
@@ -163,3 +426,47 @@ def get_chord_notes(chord_name: str) -> List[str]:
 
     return note_names
 
+def parse_scale_name(scale_name: str) -> Optional[Tuple[int, str]]:
+    """
+    'D Dorian' -> (2, 'Dorian'); aliases like 'A Aeolian' resolve to the canonical type.
+    """
+    parts = scale_name.split(" ", 1)
+    if len(parts) < 2:
+        return None
+
+    key_idx = get_note_index(parts[0])
+    scale_type = SCALE_ALIASES.get(parts[1], parts[1])
+    if key_idx == -1 or scale_type not in SCALE_DEFINITIONS:
+        return None
+    return key_idx, scale_type
+
+def get_scale(scale_name: str) -> Optional[Dict]:
+    """
+    A scale's notes (from the tonic up) and every chord that fits it, e.g. the
+    diatonic chords of 'D Dorian'. Served from SCALE_CHORDS, no set arithmetic.
+    """
+    parsed = parse_scale_name(scale_name)
+    if not parsed:
+        return None
+
+    key_idx, scale_type = parsed
+    return {
+        "scale": f"{NOTES[key_idx]} {scale_type}",
+        "notes": [NOTES[(key_idx + interval) % 12] for interval in sorted(SCALE_DEFINITIONS[scale_type])],
+        "chords": [match[3] for match in SCALE_CHORDS[key_idx][SCALE_TYPES.index(scale_type)]],
+    }
+
+def scales_containing(notes: List[str]) -> Dict:
+    """
+    Every scale that contains all of the given notes: one SCALE_INDEX lookup.
+    """
+    note_indices = {get_note_index(n) for n in notes}
+    if not note_indices:
+        return {"found": False, "message": "Select at least 1 note."}
+    if -1 in note_indices:
+        return {"found": False, "message": "Invalid notes provided."}
+
+    scales = [SCALE_NAMES[scale_id] for scale_id in SCALE_INDEX[pitch_class_mask(note_indices)]]
+    if not scales:
+        return {"found": False, "message": "No scale contains all of these notes."}
+    return {"found": True, "scales": scales}
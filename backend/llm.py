@@ -1,53 +1,236 @@
+import asyncio
 import os
-from typing import Literal
-from openai import AzureOpenAI, BadRequestError
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from typing import AsyncIterator, Literal, Optional, Protocol
 from pydantic import BaseModel
+from llm_cache import ResponseCache, cache_key
+import metrics
 
-endpoint = os.environ["AZURE_OPENAI_ENDPOINT"]
-model = os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"]
+# The LLM stack (openai, azure.identity, httpx client, credentials) is only
+# imported and built on first use, so chord/tuner workers start fast and the
+# app runs without any LLM configuration.
 
-credential = DefaultAzureCredential()
-
-token_provider = get_bearer_token_provider(
-    credential,
-    "https://cognitiveservices.azure.com/.default"
-)
-
-client = AzureOpenAI(
-    azure_endpoint=endpoint,
-    azure_ad_token_provider=token_provider,
-    api_version="2024-12-01-preview",
-)
+temperature = 0.9
 
 class Message(BaseModel):
     role: Literal['system', 'user', 'assistant']
     content: str
 
-def ask_llm(messages: list[Message]) -> list[Message]:
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[message.model_dump() for message in messages],
-            temperature=0.9,
+class LLMUnavailable(Exception):
+    """The configured provider can't be used (missing settings or packages)."""
+
+class LLMRequestError(Exception):
+    """The upstream rejected a request; the message is shown to the user as the reply."""
+
+class LLMProvider(Protocol):
+    name: str
+    model: str
+
+    async def complete(self, payload: list[dict]) -> str: ...
+
+    def stream(self, payload: list[dict]) -> AsyncIterator[str]: ...
+
+class AzureOpenAIProvider:
+    name = "azure"
+
+    def __init__(self):
+        try:
+            endpoint = os.environ["AZURE_OPENAI_ENDPOINT"]
+            self.model = os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"]
+        except KeyError as e:
+            raise LLMUnavailable(f"{e.args[0]} is not set") from e
+
+        import httpx
+        from openai import AsyncAzureOpenAI, BadRequestError
+
+        self.bad_request = BadRequestError
+        # Optional key auth (e.g. for a local OpenAI-compatible server); Entra ID otherwise
+        api_key = os.environ.get("AZURE_OPENAI_API_KEY")
+
+        # One pooled HTTP/1.1 keep-alive client shared by every request
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+
+        self.client = AsyncAzureOpenAI(
+            azure_endpoint=endpoint,
+            api_key=api_key,
+            azure_ad_token_provider=None if api_key else make_token_provider(),
+            api_version="2024-12-01-preview",
+            http_client=http_client,
         )
-        messages.append(Message(role='assistant', content=response.choices[0].message.content))
-    except BadRequestError as e:
-        response = e.response.json()
-        error = response['error']
-        content = f"BadRequestError - {error['message']}"
-        if 'innererror' in error:
-            inner_error = error['innererror']
-            code = inner_error['code']
-            content += f' - ReasonCode={code}'
-            if code == 'ResponsibleAIPolicyViolation':
-                violations = inner_error['content_filter_result']
-                for violation, reason in violations.items():
-                    if reason['filtered']:
-                        content += f" - Violation={violation} ({reason['severity']})"
-        messages.append(Message(role='assistant', content=content))
+
+    async def complete(self, payload: list[dict]) -> str:
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=payload,
+                temperature=temperature,
+            )
+        except self.bad_request as e:
+            raise LLMRequestError(describe_bad_request(e)) from e
+        metrics.record_llm_usage(self.name, response.usage)
+        return response.choices[0].message.content
+
+    async def stream(self, payload: list[dict]) -> AsyncIterator[str]:
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=payload,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                # The final chunk carries usage and no choices
+                if chunk.usage:
+                    metrics.record_llm_usage(self.name, chunk.usage)
+                # Azure sends a leading chunk with only content-filter results
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except self.bad_request as e:
+            raise LLMRequestError(describe_bad_request(e)) from e
+
+class StubProvider:
+    """Offline provider with a canned reply, for local development and benchmarks."""
+    name = "stub"
+    model = "stub"
+
+    def reply(self, payload: list[dict]) -> str:
+        question = next((m["content"] for m in reversed(payload) if m["role"] == "user"), "")
+        return f"(stub teacher) You asked: {question[:200]}"
+
+    async def complete(self, payload: list[dict]) -> str:
+        return self.reply(payload)
+
+    async def stream(self, payload: list[dict]) -> AsyncIterator[str]:
+        for i, word in enumerate(self.reply(payload).split(" ")):
+            yield word if i == 0 else " " + word
+
+PROVIDERS = {
+    "azure": AzureOpenAIProvider,
+    "stub": StubProvider,
+}
+
+def make_token_provider():
+    from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+
+    sync_provider = get_bearer_token_provider(
+        DefaultAzureCredential(),
+        "https://cognitiveservices.azure.com/.default"
+    )
+
+    async def token_provider() -> str:
+        # Token refreshes hit the network; keep them off the event loop
+        return await asyncio.to_thread(sync_provider)
+
+    return token_provider
+
+def describe_bad_request(e) -> str:
+    response = e.response.json()
+    error = response['error']
+    content = f"BadRequestError - {error['message']}"
+    if 'innererror' in error:
+        inner_error = error['innererror']
+        code = inner_error['code']
+        content += f' - ReasonCode={code}'
+        if code == 'ResponsibleAIPolicyViolation':
+            violations = inner_error['content_filter_result']
+            for violation, reason in violations.items():
+                if reason['filtered']:
+                    content += f" - Violation={violation} ({reason['severity']})"
+    return content
+
+# Upper bound on concurrent upstream calls; extra requests wait their turn
+max_concurrency = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+llm_slots = asyncio.Semaphore(max_concurrency)
+
+# Replies to identical conversations are reused; LLM_CACHE_DB adds a persistent tier
+cache = ResponseCache(
+    max_entries=int(os.environ.get("LLM_CACHE_SIZE", "512")),
+    ttl=float(os.environ.get("LLM_CACHE_TTL", "86400")),
+    sqlite_path=os.environ.get("LLM_CACHE_DB"),
+)
+
+def cache_metrics():
+    lookups = metrics.Counter("llm_cache_lookups_total", "LLM response cache lookups by outcome.", ("result",))
+    for result, stat in (("memory_hit", "memory_hits"), ("sqlite_hit", "sqlite_hits"), ("miss", "misses"), ("coalesced", "coalesced")):
+        lookups.inc(result, amount=cache.stats[stat])
+    entries = metrics.Gauge("llm_cache_entries", "Replies held in the in-memory cache tier.")
+    entries.set(value=len(cache.memory))
+    return [lookups, entries]
+
+metrics.registry.add_collector(cache_metrics)
+
+_provider: Optional[LLMProvider] = None
+_provider_lock = asyncio.Lock()
+
+def get_provider() -> LLMProvider:
+    """The provider named by LLM_PROVIDER (default "azure"), built on first call."""
+    global _provider
+    if _provider is None:
+        name = os.environ.get("LLM_PROVIDER", "azure")
+        if name not in PROVIDERS:
+            raise LLMUnavailable(f"Unknown LLM_PROVIDER {name!r}")
+        _provider = PROVIDERS[name]()
+    return _provider
+
+async def load_provider() -> LLMProvider:
+    """get_provider for async code: the first load (heavy imports) runs in a thread, off the event loop."""
+    if _provider is not None:
+        return _provider
+    async with _provider_lock:
+        return await asyncio.to_thread(get_provider)
+
+async def complete(payload: list[dict]) -> str:
+    provider = await load_provider()
+    async with llm_slots:
+        with metrics.llm_call(provider.name, "complete"):
+            return await provider.complete(payload)
+
+async def get_reply(messages: list[Message]) -> str:
+    """The assistant reply to a conversation; raises LLMRequestError if the upstream rejects it."""
+    provider = await load_provider()
+    payload = [message.model_dump() for message in messages]
+    key = cache_key(provider.model, payload, temperature=temperature)
+    return await cache.get_or_compute(key, lambda: complete(payload))
+
+async def ask_llm(messages: list[Message]) -> list[Message]:
+    try:
+        content = await get_reply(messages)
+    except LLMRequestError as e:
+        content = str(e)
+    messages.append(Message(role='assistant', content=content))
     return messages
 
+async def stream_reply(messages: list[Message]) -> AsyncIterator[str]:
+    """
+    Yields the assistant reply piece by piece as the upstream produces it.
+    A cached reply, or one already being fetched for an identical request,
+    is yielded whole; a completed stream fills the cache. Raises
+    LLMRequestError if the upstream rejects the request.
+    """
+    provider = await load_provider()
+    payload = [message.model_dump() for message in messages]
+    key = cache_key(provider.model, payload, temperature=temperature)
+
+    async def upstream() -> AsyncIterator[str]:
+        async with llm_slots:
+            with metrics.llm_call(provider.name, "stream"):
+                async for delta in provider.stream(payload):
+                    yield delta
+
+    async for delta in cache.get_or_stream(key, upstream):
+        yield delta
+
+async def stream_llm(messages: list[Message]) -> AsyncIterator[str]:
+    """stream_reply, with a rejected request's error streamed as the reply."""
+    try:
+        async for delta in stream_reply(messages):
+            yield delta
+    except LLMRequestError as e:
+        yield str(e)
+
 sample_payload = {
     "messages": [
         {
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+def cache_key(model: str, messages: list[dict], **params) -> str:
+    """Stable hash of everything that determines an upstream reply."""
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class SQLiteTier:
+    """Persistent key -> reply store with per-entry expiry."""
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl)
+            )
+            self.db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            self.db.commit()
+
+async def collect_stream(stream: AsyncIterator[str], deltas: asyncio.Queue) -> str:
+    """Forwards each delta to `deltas`, then None, and returns the whole reply."""
+    parts = []
+    try:
+        async for delta in stream:
+            parts.append(delta)
+            deltas.put_nowait(delta)
+    finally:
+        deltas.put_nowait(None)
+    return "".join(parts)
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM replies: an in-memory LRU in front of an optional
+    SQLite file, both honouring a TTL. Concurrent misses for the same key are
+    coalesced so only one upstream call runs; the rest await its result,
+    whether the call is a plain completion or a stream.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 86400.0, sqlite_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self.sqlite = SQLiteTier(sqlite_path) if sqlite_path else None
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {"memory_hits": 0, "sqlite_hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    def get_memory(self, key: str) -> Optional[str]:
+        entry = self.memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self.memory[key]
+            return None
+        self.memory.move_to_end(key)
+        return value
+
+    def set_memory(self, key: str, value: str) -> None:
+        self.memory[key] = (time.time() + self.ttl, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.get_memory(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+        if self.sqlite:
+            value = await asyncio.to_thread(self.sqlite.get, key)
+            if value is not None:
+                self.stats["sqlite_hits"] += 1
+                self.set_memory(key, value)
+                return value
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self.set_memory(key, value)
+        if self.sqlite:
+            await asyncio.to_thread(self.sqlite.set, key, value, self.ttl)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        task = self.in_flight.get(key)
+        if task:
+            self.stats["coalesced"] += 1
+        else:
+            task = self.start(key, compute)
+        # The call runs in its own task, so a caller that is cancelled (e.g. its
+        # client disconnected) doesn't cancel it for everyone else waiting on it
+        return await asyncio.shield(task)
+
+    async def get_or_stream(self, key: str, stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        get_or_compute for a streamed reply. The caller that misses yields the
+        deltas as they arrive; a hit, or a caller joining a call already in
+        flight, yields the whole reply once it is complete.
+        """
+        value = await self.get(key)
+        if value is not None:
+            yield value
+            return
+
+        task = self.in_flight.get(key)
+        if task:
+            self.stats["coalesced"] += 1
+            yield await asyncio.shield(task)
+            return
+
+        deltas: asyncio.Queue = asyncio.Queue()
+        task = self.start(key, lambda: collect_stream(stream(), deltas))
+        while (delta := await deltas.get()) is not None:
+            yield delta
+        await asyncio.shield(task)  # Raises the upstream's error, if the stream ended with one
+
+    def start(self, key: str, compute: Callable[[], Awaitable[str]]) -> asyncio.Task:
+        self.stats["misses"] += 1
+        task = self.in_flight[key] = asyncio.create_task(self.compute_and_store(key, compute))
+        # Mark a failure as seen even if every caller has gone away by then
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+    async def compute_and_store(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        try:
+            value = await compute()
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        else:
+            await self.set(key, value)
+            return value
+        finally:
+            del self.in_flight[key]
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["memory_hits"] + self.stats["sqlite_hits"] + self.stats["misses"] + self.stats["coalesced"]
+        hits = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "in_flight": len(self.in_flight),
+        }
@@ -1,12 +1,25 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from typing import List, Optional, Union
+import asyncio
+import json
 import os
-from analyzer import identify_pitch
-from chords import identify_chord, get_chord_notes, NOTES, CHORD_DEFINITIONS
-from llm import ask_llm, Message
+from functools import lru_cache
+import numpy as np
+from analyzer import identify_pitch, identify_pitches, frame_error, ChordStream, PitchTracker, SampleFormat, Temperament
+from chords import identify_chord, iter_identify_chunks, identify_chords, match_chords, get_chord_notes, NOTES, CHORD_DEFINITIONS, FUZZY_CANDIDATES
+from chords import get_scale, parse_scale_name, scales_containing, SCALE_NAMES, SCALE_TYPES
+from synth import chord_voicing, stream_chord_audio, stream_progression_audio, available_formats, AudioFormat, Engine, MEDIA_TYPES, MAX_RENDER_SECONDS, MIN_CHORD_SECONDS
+from progressions import analyze_progression, ProgressionAnalyzer
+from voicings import get_voicings, identify_shape, parse_tuning
+from assets import json_asset, respond
+from llm import ask_llm, stream_llm, load_provider, cache as llm_cache, LLMUnavailable, Message
+from sessions import store as sessions
+from metrics import MetricsMiddleware, registry as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiler import SamplingProfiler
 
 app = FastAPI()
 
@@ -19,6 +32,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency includes CORS handling; PROFILER_ENABLED turns on per-request profiling
+profiler = SamplingProfiler.from_env()
+app.add_middleware(MetricsMiddleware, routes_app=app, profiler=profiler)
+
+@app.exception_handler(LLMUnavailable)
+async def llm_unavailable_handler(request: Request, exc: LLMUnavailable):
+    return JSONResponse(status_code=503, content={"detail": f"LLM unavailable: {exc}"})
+
 class NotesRequest(BaseModel):
     notes: List[str]  # Expects notes ordered by pitch (lowest first) ideally
 
@@ -28,12 +49,63 @@ class ChordResponse(BaseModel):
     alternatives: Optional[List[dict]] = None
     message: Optional[str] = None
 
+class FuzzyRequest(BaseModel):
+    notes: List[str]
+    limit: int = Field(default=5, ge=1, le=FUZZY_CANDIDATES)
+
+class FuzzyResponse(BaseModel):
+    found: bool
+    matches: Optional[List[dict]] = None
+    message: Optional[str] = None
+
+ProgressionChord = Union[str, List[str]]  # A chord name ("A Minor", "C Major/E") or a note set
+
+class ProgressionRequest(BaseModel):
+    chords: List[ProgressionChord]
+
+# The same schema for each message of the progression WebSocket
+PROGRESSION_CHORD = TypeAdapter(ProgressionChord)
+
+class ProgressionAudioRequest(BaseModel):
+    chords: List[str] = Field(min_length=1, max_length=256)  # Chord names; slash chords set the bass
+    tempo: float = Field(default=100.0, ge=30, le=300)  # Beats per minute
+    beats_per_chord: float = Field(default=4.0, gt=0, le=16)
+    format: AudioFormat = "wav"
+    engine: Engine = "pluck"
+
+class FretPosition(BaseModel):
+    string: int  # 0 is the lowest string
+    fret: int
+
+class ShapeRequest(BaseModel):
+    positions: List[FretPosition]
+    tuning: str = "Standard"
+
+class ShapeResponse(BaseModel):
+    found: bool
+    root: Optional[str] = None
+    chord: Optional[str] = None
+    name: Optional[str] = None
+    bass: Optional[str] = None
+    inversion: Optional[int] = None
+    message: Optional[str] = None
+
 class NamedChordRequest(BaseModel):
     chord_name: str
 
 class Ask(BaseModel):
     messages: list[Message]
 
+class SessionCreate(BaseModel):
+    messages: list[Message] = []  # Typically just the system prompt; may seed earlier turns
+
+class SessionAsk(BaseModel):
+    content: str  # Only the new user message; history lives on the server
+
+class SessionReply(BaseModel):
+    session_id: str
+    message: Message
+
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok"}
@@ -43,22 +115,170 @@ async def identify(request: NotesRequest):
     result = identify_chord(request.notes)
     return result
 
+@app.post("/api/identify/batch", response_model=List[ChordResponse])
+async def identify_batch(requests: List[NotesRequest], stream: bool = False):
+    """
+    Identifies many note sets in one round trip, preserving input order.
+    Each set is one CHORD_INDEX lookup, as in /api/identify; the saving is in
+    round trips, not per-item work (a vectorized NumPy pass measured slower).
+
+    With `?stream=true` results are written as NDJSON, one ChordResponse per
+    line, a chunk at a time. That bounds only the response: the request body
+    is still parsed and validated whole, so split very large inputs into
+    several requests.
+    """
+    note_lists = [request.notes for request in requests]
+    if stream:
+        # One string per chunk: each item a sync iterator yields is its own threadpool trip
+        chunks = (
+            "".join(ChordResponse(**result).model_dump_json() + "\n" for result in chunk)
+            for chunk in iter_identify_chunks(note_lists)
+        )
+        return StreamingResponse(chunks, media_type="application/x-ndjson")
+    return identify_chords(note_lists)
+
+@app.post("/api/identify/fuzzy", response_model=FuzzyResponse)
+async def identify_fuzzy(request: FuzzyRequest):
+    """Ranks the closest chords to a note set, including partial and extended voicings."""
+    return match_chords(request.notes, request.limit)
+
+@app.post("/api/progression/analyze")
+async def analyze_chord_progression(request: ProgressionRequest):
+    """Likely key, roman numerals and borrowed/secondary chords for a whole progression."""
+    return analyze_progression(request.chords)
+
+@app.post("/api/identify/shape", response_model=ShapeResponse)
+async def identify_fretted_shape(request: ShapeRequest):
+    """Identifies a chord from string/fret positions, reporting the true bass and inversion."""
+    strings = parse_tuning(request.tuning)
+    if not strings:
+        raise HTTPException(status_code=400, detail="Unknown tuning")
+    return identify_shape([(p.string, p.fret) for p in request.positions], strings)
+
+# The chord catalog is static, so every response body is serialized once at startup
+CHORD_NAMES = [f"{root} {type_name}" for root in NOTES for type_name in CHORD_DEFINITIONS.keys()]
+CHORD_NOTES = {name: get_chord_notes(name) for name in CHORD_NAMES}
+CATALOG_ASSET = json_asset({"chords": CHORD_NAMES})
+CATALOG_NOTES_ASSET = json_asset({"chords": CHORD_NOTES})
+CHORD_ASSETS = {name: json_asset({"notes": notes}) for name, notes in CHORD_NOTES.items()}
+
 @app.get("/api/chords")
-async def get_available_chords():
+async def get_available_chords(request: Request):
     """Returns list of all possible chord names for the picker."""
-    chord_names = []
-    for root in NOTES:
-        for type_name in CHORD_DEFINITIONS.keys():
-            chord_names.append(f"{root} {type_name}")
-    return {"chords": chord_names}
+    return respond(CATALOG_ASSET, request)
+
+@app.get("/api/chords/notes")
+async def get_chord_catalog(request: Request):
+    """Every chord name mapped to its notes, so clients can resolve lookups offline."""
+    return respond(CATALOG_NOTES_ASSET, request)
 
 @app.get("/api/chord/{chord_name}")
-async def get_chord_composition(chord_name: str):
+async def get_chord_composition(chord_name: str, request: Request):
+    asset = CHORD_ASSETS.get(chord_name)
+    if asset:
+        return respond(asset, request)
+    # Spellings outside the catalog, e.g. flat roots
     notes = get_chord_notes(chord_name)
     if not notes:
         raise HTTPException(status_code=404, detail="Chord not found")
     return {"notes": notes}
 
+SCALES_CATALOG_ASSET = json_asset({"scale_types": SCALE_TYPES, "scales": SCALE_NAMES})
+
+@lru_cache(maxsize=None)
+def scale_asset(scale_name: str):
+    """
+    Pre-encoded response for a canonical scale name. Built on first request
+    rather than at startup, since compressing all of them would slow worker boot.
+    """
+    return json_asset(get_scale(scale_name))
+
+@app.get("/api/scales")
+async def get_available_scales(request: Request):
+    """Every scale type and every (key, scale type) name."""
+    return respond(SCALES_CATALOG_ASSET, request)
+
+@app.get("/api/scale/{scale_name}")
+async def get_scale_chords(scale_name: str, request: Request):
+    """A scale's notes and every chord that fits it, e.g. the diatonic chords of 'D Dorian'."""
+    parsed = parse_scale_name(scale_name)
+    if not parsed:
+        raise HTTPException(status_code=404, detail="Scale not found")
+    key_idx, scale_type = parsed
+    return respond(scale_asset(f"{NOTES[key_idx]} {scale_type}"), request)
+
+@app.post("/api/scales/containing")
+async def find_scales_containing(request: NotesRequest):
+    """Every scale containing all of the given notes, tightest fits first."""
+    return scales_containing(request.notes)
+
+# Voicing searches are pure-Python CPU work; with one at a time in the
+# threadpool, the event loop only shares the GIL with a single search thread
+voicing_slots = asyncio.Semaphore(1)
+
+@app.get("/api/chord/{chord_name}/voicings")
+async def get_chord_voicings(
+    chord_name: str,
+    tuning: str = "Standard",
+    capo: int = Query(0, ge=0, le=12),
+    span: int = Query(4, ge=1, le=6),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+):
+    """
+    Playable six-string voicings of a chord, best first, one page at a time.
+    An uncached search can take tens of milliseconds, so it runs in the threadpool.
+    """
+    strings = parse_tuning(tuning)
+    if not strings:
+        raise HTTPException(status_code=400, detail="Unknown tuning")
+    async with voicing_slots:
+        result = await run_in_threadpool(get_voicings, chord_name, strings, capo, span, offset=(page - 1) * page_size, limit=page_size)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Chord not found")
+    return {"chord": chord_name, "page": page, "page_size": page_size, **result}
+
+def audio_response(chunks, audio_format: AudioFormat, filename: str) -> StreamingResponse:
+    if audio_format not in available_formats():
+        raise HTTPException(status_code=400, detail=f"{audio_format} output is not available on this server")
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[audio_format],
+        headers={"Content-Disposition": f'inline; filename="{filename}.{audio_format}"'},
+    )
+
+@app.get("/api/chord/{chord_name}/audio")
+async def render_chord_audio(
+    chord_name: str,
+    format: AudioFormat = "wav",
+    engine: Engine = "pluck",
+    seconds: float = Query(2.0, ge=0.25, le=10),
+    bass: Optional[str] = None,
+):
+    """
+    A strummed chord as WAV or Ogg, streamed as it is encoded. Renders are
+    cached. `bass` voices a slash chord ('C Major' with bass=E is C Major/E).
+    """
+    voicing = chord_voicing(f"{chord_name}/{bass}" if bass else chord_name)
+    if voicing is None:
+        raise HTTPException(status_code=404, detail="Chord not found")
+    filename = f"{chord_name} over {bass}" if bass else chord_name
+    return audio_response(stream_chord_audio(voicing, seconds, engine, format), format, filename)
+
+@app.post("/api/progression/audio")
+async def render_progression_audio(request: ProgressionAudioRequest):
+    """A progression at the given tempo, one strum per chord, rendered and streamed chord by chord."""
+    voicings = [chord_voicing(name) for name in request.chords]
+    unknown = [name for name, voicing in zip(request.chords, voicings) if voicing is None]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown chords: {', '.join(unknown)}")
+    seconds_per_chord = request.beats_per_chord * 60 / request.tempo
+    if seconds_per_chord < MIN_CHORD_SECONDS:
+        raise HTTPException(status_code=422, detail=f"Each chord must last at least {MIN_CHORD_SECONDS} seconds")
+    if seconds_per_chord * len(voicings) > MAX_RENDER_SECONDS:
+        raise HTTPException(status_code=422, detail=f"Progressions are limited to {MAX_RENDER_SECONDS:.0f} seconds")
+    return audio_response(stream_progression_audio(voicings, seconds_per_chord, request.engine, request.format), request.format, "progression")
+
 @app.get("/api/tuner/analyze")
 async def analyze_pitch(hz: float):
     result = identify_pitch(hz)
@@ -66,40 +286,220 @@ async def analyze_pitch(hz: float):
          return {"note": None}
     return result
 
+@app.post("/api/tuner/analyze/batch")
+async def analyze_pitches(request: Request, reference_hz: float = 440.0, temperament: Temperament = "equal"):
+    """
+    Bulk version of /api/tuner/analyze. The body is either a JSON array of
+    frequencies or packed little-endian float32 (application/octet-stream).
+    Results are parallel arrays; entries that aren't a positive frequency get midi -1.
+
+    Send `Accept: application/octet-stream` to get the arrays back packed, in
+    field order: note_index int8, octave int16, midi int16, cents float32,
+    perfect_hz float32 (NaN for invalid entries).
+    """
+    if reference_hz <= 0:
+        raise HTTPException(status_code=422, detail="reference_hz must be positive")
+
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/octet-stream"):
+        if len(body) % 4:
+            raise HTTPException(status_code=400, detail="Body must be packed float32 values")
+        hz = np.frombuffer(body, dtype="<f4")
+    else:
+        try:
+            hz = np.asarray(json.loads(body), dtype=np.float64)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of frequencies")
+        if hz.ndim != 1:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of frequencies")
+
+    result = identify_pitches(hz, reference_hz, temperament)
+    if "application/octet-stream" in request.headers.get("accept", ""):
+        packed = b"".join(column.astype(column.dtype.newbyteorder("<"), copy=False).tobytes() for column in result)
+        return Response(packed, media_type="application/octet-stream")
+
+    # JSON has no NaN; invalid entries are flagged by midi == -1 instead
+    valid = result.midi >= 0
+    return {
+        "notes": NOTES,
+        "note_index": result.note_index.tolist(),
+        "octave": result.octave.tolist(),
+        "midi": result.midi.tolist(),
+        "cents": np.where(valid, result.cents, 0).tolist(),
+        "perfect_hz": np.where(valid, result.perfect_hz, 0).tolist(),
+    }
+
+@app.websocket("/api/tuner/stream")
+async def stream_pitch(websocket: WebSocket, sample_rate: int = Query(44100, gt=0), format: SampleFormat = "float32"):
+    """
+    Accepts binary mono PCM frames (little-endian float32 or int16) and replies
+    to each with the smoothed tuner reading, or {"note": null} for silence.
+    A frame that isn't a whole number of samples gets {"error": ...}.
+    """
+    await websocket.accept()
+    tracker = PitchTracker(sample_rate, format)
+    try:
+        while True:
+            frame = await websocket.receive_bytes()
+            error = frame_error(frame, format)
+            if error:
+                await websocket.send_json({"error": error})
+                continue
+            result = tracker.process(frame)
+            await websocket.send_json(result if result else {"note": None})
+    except WebSocketDisconnect:
+        pass
+
+@app.websocket("/api/chords/stream")
+async def stream_chords(websocket: WebSocket, sample_rate: int = Query(44100, gt=0), format: SampleFormat = "float32"):
+    """
+    Accepts binary mono PCM chunks of strummed audio and pushes a chord-change
+    event ({"time", "chord", "confidence"}) whenever the recognized chord changes.
+    A chunk that isn't a whole number of samples gets {"error": ...}.
+    """
+    await websocket.accept()
+    stream = ChordStream(sample_rate, format)
+    try:
+        while True:
+            chunk = await websocket.receive_bytes()
+            error = frame_error(chunk, format)
+            if error:
+                await websocket.send_json({"error": error})
+                continue
+            for event in stream.process(chunk):
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+
+@app.websocket("/api/progression/stream")
+async def stream_progression(websocket: WebSocket):
+    """
+    Live progression analysis: send one chord per JSON message (a name or a
+    list of notes) and get back its roman numeral in the key as it stands,
+    with `key_changed` set when the running key estimate moves.
+    """
+    await websocket.accept()
+    analyzer = ProgressionAnalyzer()
+    try:
+        while True:
+            try:
+                chord = PROGRESSION_CHORD.validate_json(await websocket.receive_text())
+            except ValidationError:
+                await websocket.send_json({"found": False, "message": "Send a chord name or a list of notes."})
+                continue
+            await websocket.send_json(analyzer.add(chord))
+    except WebSocketDisconnect:
+        pass
+
 @app.post("/api/llm/ask")
 async def ask(request: Ask) -> Ask:
-    results = ask_llm(request.messages)
+    results = await ask_llm(request.messages)
     return Ask(messages=results)
 
+@app.post("/api/llm/ask/stream")
+async def ask_stream(request: Ask):
+    """
+    Server-Sent Events variant of /api/llm/ask: each `data:` event carries a
+    JSON {"content": ...} delta, followed by a final `event: done`.
+    """
+    await load_provider()  # Fail with 503 before the stream starts
+    return sse_response(stream_llm(request.messages))
+
+def sse_response(deltas) -> StreamingResponse:
+    async def events():
+        try:
+            async for delta in deltas:
+                yield f"data: {json.dumps({'content': delta})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        finally:
+            await deltas.aclose()  # On disconnect too, so a session stream releases its lock and rolls back now
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/llm/sessions")
+async def create_session(request: SessionCreate):
+    session = await sessions.create(request.messages)
+    return {"session_id": session.id}
+
+@app.get("/api/llm/sessions/{session_id}")
+async def get_session(session_id: str):
+    session = await sessions.get(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session.id, "summary": session.summary, "messages": session.system + session.turns}
+
+@app.delete("/api/llm/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not await sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"deleted": True}
+
+@app.post("/api/llm/sessions/{session_id}/ask")
+async def ask_in_session(session_id: str, request: SessionAsk) -> SessionReply:
+    reply = await sessions.ask(session_id, request.content)
+    if reply is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return SessionReply(session_id=session_id, message=reply)
+
+@app.post("/api/llm/sessions/{session_id}/ask/stream")
+async def ask_in_session_stream(session_id: str, request: SessionAsk):
+    """SSE variant of the session ask, in the same event format as /api/llm/ask/stream."""
+    if not await sessions.get(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    await load_provider()  # Fail with 503 before the stream starts
+    return sse_response(sessions.stream(session_id, request.content))
+
+@app.get("/api/llm/cache/stats")
+async def llm_cache_stats():
+    """Hit/miss counters for the LLM response cache."""
+    return llm_cache.snapshot()
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, LLM and cache metrics for this process."""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+if profiler:
+    @app.get("/api/debug/profiles/{profile_id}", response_class=PlainTextResponse)
+    async def get_profile(profile_id: str):
+        """
+        A finished request profile in collapsed-stack format, for flamegraph.pl or
+        speedscope. Profile a request by sending it with an `X-Profile: 1` header;
+        the id comes back in `X-Profile-Id`.
+        """
+        stacks = profiler.get(profile_id)
+        if stacks is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return stacks
+
 # Serve static files (Frontend)
 use_static = os.path.isdir("backend/static") or os.path.isdir("static")
 static_dir = "backend/static" if os.path.isdir("backend/static") else "static"
 
 if use_static:
-    from fastapi.responses import FileResponse
-
-    # Serve assets folder
-    assets_dir = os.path.join(static_dir, "assets")
-    if os.path.isdir(assets_dir):
-        app.mount("/assets", StaticFiles(directory=assets_dir), name="assets")
-
-    # Serve specific root-level static files
-    @app.get("/vite.svg")
-    async def serve_vite_icon():
-        return FileResponse(os.path.join(static_dir, "vite.svg"))
-    
-    @app.get("/icon-192.png")
-    async def serve_favicon():
-        return FileResponse(os.path.join(static_dir, "icon-192.png"))
-
-    # Catch-all route to serve index.html for SPA routing
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        index_path = os.path.join(static_dir, "index.html")
-        if os.path.isfile(index_path):
-            return FileResponse(index_path)
-        raise HTTPException(status_code=404, detail="Static files not found")
+    from assets import AssetStore
+
+    # The whole build is loaded (and compressed) once; requests never touch the disk
+    static_assets = AssetStore(static_dir)
+
+    # Catch-all route: built files by path, index.html for SPA routing
+    @app.api_route("/{full_path:path}", methods=["GET", "HEAD"])
+    async def serve_spa(full_path: str, request: Request):
+        asset = static_assets.get(f"/{full_path}")
+        if asset is None:
+            if full_path.startswith("assets/"):
+                raise HTTPException(status_code=404, detail="Not Found")
+            asset = static_assets.get("/index.html")
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Static files not found")
+        return respond(asset, request)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # WEB_CONCURRENCY sets the worker count, as with the uvicorn CLI; extra workers import the app by name
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    uvicorn.run("main:app" if workers > 1 else app, host="0.0.0.0", port=8000, workers=workers)
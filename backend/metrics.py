@@ -0,0 +1,208 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from starlette.routing import Match
+
+# Prometheus text exposition (version 0.0.4) without the client library: the
+# app is a single process per worker and only needs counters, gauges and
+# histograms recorded from the event loop thread.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+Labels = Tuple[str, ...]
+
+def format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{format_labels(self.label_names, labels)} {format_value(value)}"
+            for labels, value in self.values.items()
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, *labels: str, value: float) -> None:
+        self.values[labels] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = HTTP_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self.series: Dict[Labels, List[float]] = {}  # Per-bucket counts (non-cumulative), +Inf count, then sum
+
+    def observe(self, *labels: str, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = format_labels(self.label_names, labels, f'le="{format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_text = format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        """`collector` builds metrics from state owned elsewhere, each time /metrics is scraped."""
+        self.collectors.append(collector)
+
+    def render(self) -> bytes:
+        metrics = list(self.metrics)
+        for collector in self.collectors:
+            metrics.extend(collector())
+        return ("\n".join(line for metric in metrics for line in metric.render()) + "\n").encode()
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte.", ("method", "route")))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests being handled, including open WebSocket connections.", ("method", "route")))
+
+llm_in_flight = registry.register(Gauge(
+    "llm_upstream_in_flight", "Upstream LLM calls holding a concurrency slot.", ("provider",)))
+llm_latency = registry.register(Histogram(
+    "llm_upstream_duration_seconds", "Upstream LLM call time, to the end of the stream for streamed replies.",
+    ("provider", "mode"), buckets=LLM_BUCKETS))
+llm_errors = registry.register(Counter(
+    "llm_upstream_errors_total", "Failed upstream LLM calls by exception type.", ("provider", "mode", "error")))
+llm_tokens = registry.register(Counter(
+    "llm_tokens_total", "Tokens reported in upstream usage.", ("provider", "type")))
+
+def route_label(routes, scope) -> str:
+    """The matched route's path template, so `/api/chord/{chord_name}` is one series rather than one per chord."""
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match is not Match.NONE:
+            return route.path
+    return "unmatched"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status counts and in-flight
+    requests. A pure ASGI wrapper rather than BaseHTTPMiddleware, so streamed
+    responses aren't buffered and latency covers the whole body.
+    """
+
+    def __init__(self, app, routes_app=None, profiler=None):
+        self.app = app
+        self.routes_app = routes_app  # The FastAPI app whose routes give the labels
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        method = scope.get("method", "WS")
+        route = route_label(self.routes_app.routes, scope)
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            elif message["type"] == "websocket.accept":
+                status = "101"
+            elif message["type"] == "websocket.close" and status == "500":
+                status = "403"  # Closed before accepting
+            await send(message)
+
+        profile = self.profiler.start(scope) if self.profiler else None
+        if profile:
+            send_wrapper = profile.wrap_send(send_wrapper)
+
+        http_in_flight.inc(method, route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profile:
+                self.profiler.stop(profile)
+            http_in_flight.dec(method, route)
+            http_requests.inc(method, route, status)
+            if scope["type"] == "http":
+                http_latency.observe(method, route, value=time.perf_counter() - start)
+
+@contextmanager
+def llm_call(provider: str, mode: str) -> Iterator[None]:
+    """Times one upstream call (mode "complete" or "stream") and counts it as an error if it raises."""
+    llm_in_flight.inc(provider)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        llm_errors.inc(provider, mode, type(e).__name__)
+        raise
+    finally:
+        llm_in_flight.dec(provider)
+        llm_latency.observe(provider, mode, value=time.perf_counter() - start)
+
+def record_llm_usage(provider: str, usage) -> None:
+    """`usage` is the upstream's usage object (prompt_tokens / completion_tokens), or None if it sent none."""
+    if usage is None:
+        return
+    llm_tokens.inc(provider, "prompt", amount=usage.prompt_tokens or 0)
+    llm_tokens.inc(provider, "completion", amount=usage.completion_tokens or 0)
@@ -0,0 +1,119 @@
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Optional
+
+# Opt-in per-request sampling profiler. With PROFILER_ENABLED=1, a request
+# carrying an `X-Profile: 1` header gets a sampler thread that records the
+# event loop thread's stack every PROFILER_INTERVAL_MS until the response is
+# done. The response carries an `X-Profile-Id` header; the profile can then
+# be fetched in collapsed-stack format ("outer;inner;leaf count" per line),
+# which flamegraph.pl, speedscope and inferno all read directly.
+#
+# The event loop is shared, so a profile also shows whatever else the loop
+# ran meanwhile; profile on a quiet instance for a clean picture. Time spent
+# waiting (e.g. on the LLM upstream) shows up as the selector's select().
+# While the loop is busy in Python code, the sampler only gets the GIL every
+# sys.getswitchinterval() (5 ms by default), which bounds the sample rate.
+#
+# Finished profiles are files in PROFILER_DIR, so with several workers any of
+# them can serve a profile recorded by another.
+
+PROFILE_HEADER = b"x-profile"
+MAX_DEPTH = 128
+PROFILE_ID = re.compile(r"[0-9a-f]{16}")
+DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "chord-coordinator-profiles")
+
+class Profile:
+    def __init__(self, thread_id: int, interval: float, on_done: Callable[["Profile"], None]):
+        self.id = uuid.uuid4().hex[:16]
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.started = time.time()
+        self.duration = 0.0
+        self.on_done = on_done
+        self.stopping = threading.Event()
+
+    def wrap_send(self, send):
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", self.id.encode())]}
+            await send(message)
+        return send_with_id
+
+    def sample(self) -> None:
+        start = time.perf_counter()
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                code = frame.f_code
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+        self.duration = time.perf_counter() - start
+        self.on_done(self)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.001, keep: int = 32, directory: str = DEFAULT_DIR):
+        self.interval = interval
+        self.keep = keep
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["SamplingProfiler"]:
+        """A profiler if PROFILER_ENABLED is set, else None (and profiling headers are ignored)."""
+        if os.environ.get("PROFILER_ENABLED", "").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            interval=float(os.environ.get("PROFILER_INTERVAL_MS", "1")) / 1000,
+            keep=int(os.environ.get("PROFILER_KEEP", "32")),
+            directory=os.environ.get("PROFILER_DIR", DEFAULT_DIR),
+        )
+
+    def start(self, scope) -> Optional[Profile]:
+        if scope["type"] != "http" or (PROFILE_HEADER, b"1") not in scope.get("headers", ()):
+            return None
+        profile = Profile(threading.get_ident(), self.interval, self.save)
+        threading.Thread(target=profile.sample, name=f"profiler-{profile.id}", daemon=True).start()
+        return profile
+
+    def stop(self, profile: Profile) -> None:
+        profile.stopping.set()  # The sampler finishes on its own; nothing here waits on it
+
+    def save(self, profile: Profile) -> None:
+        """Writes a finished profile (from its sampler thread), then drops all but the newest `keep`."""
+        path = self.directory / f"{profile.id}.folded"
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(profile.collapsed())
+        os.replace(tmp_path, path)
+
+        saved = []
+        for entry in self.directory.glob("*.folded"):
+            try:
+                saved.append((entry.stat().st_mtime, entry))
+            except FileNotFoundError:
+                pass  # Pruned by another worker
+        for _, entry in sorted(saved, reverse=True)[self.keep:]:
+            entry.unlink(missing_ok=True)
+
+    def get(self, profile_id: str) -> Optional[str]:
+        """A finished profile's collapsed stacks, or None if the id is unknown, evicted or still recording."""
+        if not PROFILE_ID.fullmatch(profile_id):
+            return None
+        try:
+            return (self.directory / f"{profile_id}.folded").read_text()
+        except FileNotFoundError:
+            return None
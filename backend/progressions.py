@@ -0,0 +1,224 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+import tables
+from chords import (
+    CHORD_DEFINITIONS, CHORD_MASK_MATRIX, NOTES, SCALE_DEFINITIONS, get_note_index, identify_chord, parse_chord_name,
+    pitch_class_mask, rotate_mask,
+)
+
+# Key finding for chord progressions. Each (root, chord type) has a
+# precomputed fit against all 24 major and minor keys, so a key's likelihood
+# is a running sum: appending a chord adds one row of KEY_FIT, O(keys).
+
+MODES = ("Major", "Minor")
+KEYS = [(tonic, mode) for mode in MODES for tonic in range(12)]  # Major keys first, then minor
+KEY_NAMES = [f"{NOTES[tonic]} {mode}" for tonic, mode in KEYS]
+
+# Krumhansl-Kessler key profiles: how well each scale degree fits the key
+KEY_PROFILES = {
+    "Major": np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88]),
+    "Minor": np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17]),
+}
+
+# Diatonic collections, as masks on a C tonic; minor chords may come from the
+# natural or the harmonic form (raised 7th for V and vii°)
+SCALES = {
+    "Major": [pitch_class_mask(SCALE_DEFINITIONS["Major"])],
+    "Minor": [pitch_class_mask(SCALE_DEFINITIONS["Minor"]), pitch_class_mask(SCALE_DEFINITIONS["Harmonic Minor"])],
+}
+
+DIATONIC_BONUS = 1.0
+TONIC_BONUS = 1.0
+DOMINANT_BONUS = 0.5
+
+# Numerals by semitones above the tonic; in minor, the natural-minor degrees have no accidental
+NUMERALS = {
+    "Major": ["I", "bII", "II", "bIII", "III", "IV", "#IV", "V", "bVI", "VI", "bVII", "VII"],
+    "Minor": ["I", "bII", "II", "III", "#III", "IV", "#IV", "V", "VI", "#VI", "VII", "#VII"],
+}
+
+# Roman numeral suffix per chord type; minor-third chords get a lowercase numeral
+ROMAN_SUFFIXES = {
+    "Major": "", "Minor": "", "Diminished": "°", "Augmented": "+", "Sus2": "sus2", "Sus4": "sus4",
+    "Major 7th": "maj7", "Minor 7th": "7", "Dominant 7th": "7", "Diminished 7th": "°7", "Half-Diminished 7th": "ø7",
+    "Add9": "add9", "Add4": "add4", "Minor Add9": "add9", "Major 6th": "6", "Minor 6th": "6",
+    "Minor Major 7th": "(maj7)", "Dominant 7th Sus4": "7sus4", "Major 6/9": "6/9",
+    "Dominant 9th": "9", "Major 9th": "maj9", "Minor 9th": "9", "Dominant 11th": "11", "Minor 11th": "11",
+    "Major 7th #11": "maj7#11", "Dominant 13th": "13", "Major 13th": "maj13", "Minor 13th": "13",
+    "Dominant 7th b5": "7b5", "Dominant 7th #5": "7#5", "Dominant 7th b9": "7b9", "Dominant 7th #9": "7#9",
+    "Dominant 7th #11": "7#11", "Dominant 7th b13": "7b13", "Altered Dominant": "7alt",
+    "Major 7th (no 5)": "maj7(no5)", "Minor 7th (no 5)": "7(no5)", "Dominant 7th (no 5)": "7(no5)",
+    "Major 9th (no 5)": "maj9(no5)", "Minor 9th (no 5)": "9(no5)", "Dominant 9th (no 5)": "9(no5)",
+    "Dominant 13th (no 5)": "13(no5)", "Dominant 7th #9 (no 5)": "7#9(no5)",
+}
+assert set(ROMAN_SUFFIXES) == set(CHORD_DEFINITIONS), "every chord type needs a roman numeral suffix"
+
+CHORD_TYPES = list(CHORD_DEFINITIONS)
+TYPE_INDEX = {type_name: i for i, type_name in enumerate(CHORD_TYPES)}
+
+def is_lowercase(type_name: str) -> bool:
+    """Minor, diminished and half-diminished chords: a minor third and no major third."""
+    intervals = CHORD_DEFINITIONS[type_name]
+    return 3 in intervals and 4 not in intervals
+
+def is_dominant(type_name: str) -> bool:
+    """Chords that can act as a (secondary) dominant: a major triad or any dominant seventh."""
+    intervals = CHORD_DEFINITIONS[type_name]
+    return type_name == "Major" or {4, 10} <= intervals
+
+def is_leading_tone(type_name: str) -> bool:
+    return type_name in ("Diminished", "Diminished 7th", "Half-Diminished 7th")
+
+def in_scale(chord_mask: int, tonic: int, mode: str) -> bool:
+    return any(chord_mask & ~rotate_mask(scale, tonic) == 0 for scale in SCALES[mode])
+
+def build_key_fit() -> np.ndarray:
+    """
+    (12, chord types, 24 keys) fit of each chord to each key: the mean
+    key-profile weight of its tones, plus bonuses for being diatonic, the
+    tonic chord or the dominant.
+    """
+    fit = np.zeros((12, len(CHORD_TYPES), len(KEYS)))
+    for root in range(12):
+        for t, type_name in enumerate(CHORD_TYPES):
+            chord_mask = int(CHORD_MASK_MATRIX[root, t])
+            tones = [pc for pc in range(12) if chord_mask >> pc & 1]
+            for k, (tonic, mode) in enumerate(KEYS):
+                profile = KEY_PROFILES[mode]
+                score = np.mean([profile[(pc - tonic) % 12] for pc in tones]) / profile.max()
+                if in_scale(chord_mask, tonic, mode):
+                    score += DIATONIC_BONUS
+                    if root == tonic:
+                        score += TONIC_BONUS
+                    elif root == (tonic + 7) % 12 and is_dominant(type_name):
+                        score += DOMINANT_BONUS
+                fit[root, t, k] = score
+    return fit
+
+KEY_FIT = tables.load("key_fit", build_key_fit)
+
+def diatonic_triad(degree: int, tonic: int, mode: str) -> Optional[str]:
+    """The numeral of the diatonic triad on `degree` semitones above the tonic, if there is one."""
+    for type_name in ("Major", "Minor", "Diminished"):
+        if in_scale(int(CHORD_MASK_MATRIX[(tonic + degree) % 12, TYPE_INDEX[type_name]]), tonic, mode):
+            return roman_numeral(degree, type_name, mode)
+    return None
+
+def roman_numeral(degree: int, type_name: str, mode: str) -> str:
+    numeral = NUMERALS[mode][degree]
+    if mode == "Minor" and degree == 11 and is_leading_tone(type_name):
+        numeral = "VII"  # The leading-tone chord is plain vii°, not #vii°
+    if is_lowercase(type_name):
+        degree_name = numeral.lstrip("b#")
+        numeral = numeral[:len(numeral) - len(degree_name)] + degree_name.lower()
+    return numeral + ROMAN_SUFFIXES[type_name]
+
+def parallel_mode(mode: str) -> str:
+    return "Minor" if mode == "Major" else "Major"
+
+def chord_function(root: int, type_name: str, key: int) -> Dict:
+    """Roman numeral and role (diatonic, secondary, borrowed or chromatic) of a chord in a key."""
+    tonic, mode = KEYS[key]
+    chord_mask = int(CHORD_MASK_MATRIX[root, TYPE_INDEX[type_name]])
+    degree = (root - tonic) % 12
+    numeral = roman_numeral(degree, type_name, mode)
+
+    if in_scale(chord_mask, tonic, mode):
+        return {"numeral": numeral, "function": "diatonic"}
+
+    # Secondary dominants resolve down a fifth, leading-tone chords up a semitone
+    if is_dominant(type_name) or is_leading_tone(type_name):
+        target_degree = (degree + (5 if is_dominant(type_name) else 1)) % 12
+        target = diatonic_triad(target_degree, tonic, mode) if target_degree else None
+        if target and not target.endswith("°"):
+            applied = "V" + ROMAN_SUFFIXES[type_name] if is_dominant(type_name) else roman_numeral(11, type_name, "Major")
+            return {"numeral": f"{applied}/{target}", "function": "secondary", "target": target}
+
+    if in_scale(chord_mask, tonic, parallel_mode(mode)):
+        return {"numeral": numeral, "function": "borrowed", "from": f"{NOTES[tonic]} {parallel_mode(mode)}"}
+
+    return {"numeral": numeral, "function": "chromatic"}
+
+ChordInput = Union[str, List[str]]
+
+def parse_progression_chord(chord: ChordInput) -> Optional[Tuple[int, str, str]]:
+    """
+    A chord name ('A Minor', 'C Major/E') or a note set (['E', 'G', 'C']) ->
+    (root index, chord type, display name), or None if it isn't recognized.
+    """
+    if isinstance(chord, str):
+        name = chord.strip()
+        parsed = parse_chord_name(name)
+        if parsed is None and "/" in name:
+            # Slash chord: the bass doesn't change the harmonic function
+            head, bass = name.rsplit("/", 1)
+            if get_note_index(bass) != -1:
+                parsed = parse_chord_name(head)
+        if parsed is None:
+            return None
+        return parsed[0], parsed[1], name
+
+    result = identify_chord(chord)
+    if not result["found"]:
+        return None
+    primary = result["primary"]
+    return get_note_index(primary["root"]), primary["chord"], primary["name"]
+
+class ProgressionAnalyzer:
+    """
+    Running key analysis of a chord progression. `add` costs O(keys): it adds
+    the chord's key-fit row to the per-key totals and labels the chord in the
+    currently most likely key. `analysis` relabels every chord in that key.
+    """
+
+    def __init__(self):
+        self.key_scores = np.zeros(len(KEYS))
+        self.chords: List[Tuple[int, str, str]] = []
+        self.key: Optional[int] = None
+
+    def add(self, chord: ChordInput) -> Dict:
+        parsed = parse_progression_chord(chord)
+        if parsed is None:
+            return {"found": False, "input": chord, "message": "Unrecognized chord."}
+
+        root, type_name, name = parsed
+        self.chords.append(parsed)
+        self.key_scores += KEY_FIT[root, TYPE_INDEX[type_name]]
+        previous_key, self.key = self.key, int(np.argmax(self.key_scores))
+        return {
+            "found": True,
+            "chord": name,
+            **chord_function(root, type_name, self.key),
+            "key": KEY_NAMES[self.key],
+            "key_changed": previous_key is not None and previous_key != self.key,
+        }
+
+    def candidates(self, limit: int = 3) -> List[Dict]:
+        """The most likely keys, with each score as the mean fit per chord."""
+        count = max(len(self.chords), 1)
+        best = np.argsort(-self.key_scores, kind="stable")[:limit]
+        return [{"key": KEY_NAMES[k], "score": round(float(self.key_scores[k]) / count, 3)} for k in best]
+
+    def analysis(self) -> Dict:
+        if self.key is None:
+            return {"found": False, "message": "No recognized chords."}
+        return {
+            "found": True,
+            "key": KEY_NAMES[self.key],
+            "candidates": self.candidates(),
+            "chords": [{"chord": name, **chord_function(root, type_name, self.key)} for root, type_name, name in self.chords],
+        }
+
+def analyze_progression(chords: Iterable[ChordInput]) -> Dict:
+    """Key, roman numerals and borrowed/secondary chords for a whole progression."""
+    analyzer = ProgressionAnalyzer()
+    unrecognized = []
+    for i, chord in enumerate(chords):
+        if not analyzer.add(chord)["found"]:
+            unrecognized.append(i)
+    result = analyzer.analysis()
+    if unrecognized:
+        result["unrecognized"] = unrecognized
+    return result
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Literal, Optional, get_args
+
+from llm import LLMRequestError, Message, complete, get_reply, stream_reply
+
+# Rough prompt-size estimate: ~4 characters per token plus per-message overhead
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = (
+    "Summarize the earlier part of this guitar lesson conversation in a few sentences. "
+    "Keep chord names, keys, song details and anything the student asked to remember."
+)
+
+# Room left in the budget for the summary message when summarizing
+SUMMARY_RESERVE_TOKENS = 200
+
+# Turns of one session run one at a time, across workers too: a turn holds a
+# lease on the session row. The lease outlives any upstream call (60 s
+# timeout, plus a summary call), so it only expires if a worker died mid-turn.
+LEASE_SECONDS = 300.0
+LEASE_POLL_SECONDS = 0.05
+
+CompactionStrategy = Literal["truncate", "summarize"]
+
+def estimate_tokens(messages: list[Message]) -> int:
+    return sum(len(message.content) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+class Session:
+    def __init__(self, session_id: str, system: list[Message], summary: Optional[str], turns: list[Message]):
+        self.id = session_id
+        self.system = system
+        self.summary = summary
+        self.turns = turns
+
+    @classmethod
+    def from_messages(cls, messages: list[Message]) -> "Session":
+        system = [message for message in messages if message.role == 'system']
+        turns = [message for message in messages if message.role != 'system']
+        return cls(uuid.uuid4().hex, system, None, turns)
+
+    def prompt(self) -> list[Message]:
+        """The message list sent upstream: system prompt, summary of compacted turns, recent turns."""
+        summary = [Message(role='system', content=f"Summary of the conversation so far: {self.summary}")] if self.summary else []
+        return self.system + summary + self.turns
+
+def dump_messages(messages: list[Message]) -> str:
+    return json.dumps([message.model_dump() for message in messages])
+
+def load_messages(data: str) -> list[Message]:
+    return [Message(**message) for message in json.loads(data)]
+
+class SessionStore:
+    """
+    Server-side chat history, so clients only upload each new message.
+    When a prompt would exceed `token_budget`, the oldest turns are dropped
+    ("truncate") or folded into a running summary ("summarize"). Idle
+    sessions expire after `ttl` seconds and at most `max_sessions` are kept.
+
+    Sessions live in SQLite: a file at `path` is shared by every worker
+    process, while a private in-memory database only suits a single worker.
+    The database is opened on first use. A turn is saved only once its reply
+    is complete, so a failed or abandoned ask leaves the history as it was.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        token_budget: int = 3000,
+        strategy: CompactionStrategy = "truncate",
+        max_sessions: int = 1000,
+        ttl: float = 3600.0,
+    ):
+        if strategy not in get_args(CompactionStrategy):
+            raise ValueError(f"Unknown history compaction {strategy!r}; expected one of {', '.join(get_args(CompactionStrategy))}")
+        self.token_budget = token_budget
+        self.strategy = strategy
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.lock = threading.Lock()  # File-backed store calls run in worker threads
+        self.path = path
+        self.in_memory = path == ":memory:"
+        self.connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """The connection, opened on first use (always under self.lock), so a process that never serves a session creates no file."""
+        if self.connection is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            if not self.in_memory:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")  # Losing the last turns in a power cut is fine
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, system TEXT NOT NULL, summary TEXT, turns TEXT NOT NULL, "
+                "last_used REAL NOT NULL, lease TEXT, lease_until REAL NOT NULL DEFAULT 0)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+            db.commit()
+            self.connection = db
+        return self.connection
+
+    def _create(self, session: Session) -> None:
+        now = time.time()
+        with self.lock:
+            self.db.execute("DELETE FROM sessions WHERE last_used <= ?", (now - self.ttl,))
+            self.db.execute(
+                "INSERT INTO sessions (id, system, summary, turns, last_used) VALUES (?, ?, ?, ?, ?)",
+                (session.id, dump_messages(session.system), session.summary, dump_messages(session.turns), now),
+            )
+            self.db.execute(
+                "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            self.db.commit()
+
+    def _get(self, session_id: str) -> Optional[Session]:
+        now = time.time()
+        with self.lock:
+            self.db.execute("DELETE FROM sessions WHERE last_used <= ?", (now - self.ttl,))
+            self.db.execute("UPDATE sessions SET last_used = ? WHERE id = ?", (now, session_id))
+            self.db.commit()
+            row = self.db.execute("SELECT system, summary, turns FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        return Session(session_id, load_messages(row[0]), row[1], load_messages(row[2]))
+
+    def _delete(self, session_id: str) -> bool:
+        with self.lock:
+            deleted = self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount
+            self.db.commit()
+        return deleted > 0
+
+    def _acquire(self, session_id: str, lease: str) -> Optional[bool]:
+        """True if the lease was taken, False if another turn holds it, None if the session is gone."""
+        now = time.time()
+        with self.lock:
+            taken = self.db.execute(
+                "UPDATE sessions SET lease = ?, lease_until = ? WHERE id = ? AND last_used > ? AND (lease IS NULL OR lease_until <= ?)",
+                (lease, now + LEASE_SECONDS, session_id, now - self.ttl, now),
+            ).rowcount
+            self.db.commit()
+            if taken:
+                return True
+            exists = self.db.execute("SELECT 1 FROM sessions WHERE id = ? AND last_used > ?", (session_id, now - self.ttl)).fetchone()
+        return False if exists else None
+
+    def _release(self, session_id: str, lease: str, session: Optional[Session]) -> None:
+        """Ends the turn, saving the session if it completed; a session deleted meanwhile stays deleted."""
+        with self.lock:
+            if session is not None:
+                self.db.execute(
+                    "UPDATE sessions SET summary = ?, turns = ?, last_used = ? WHERE id = ? AND lease = ?",
+                    (session.summary, dump_messages(session.turns), time.time(), session_id, lease),
+                )
+            self.db.execute("UPDATE sessions SET lease = NULL, lease_until = 0 WHERE id = ? AND lease = ?", (session_id, lease))
+            self.db.commit()
+
+    async def run(self, call, *args):
+        """In-memory queries take microseconds and run inline; file I/O goes to a worker thread."""
+        return call(*args) if self.in_memory else await asyncio.to_thread(call, *args)
+
+    async def create(self, messages: list[Message]) -> Session:
+        session = Session.from_messages(messages)
+        await self.run(self._create, session)
+        return session
+
+    async def get(self, session_id: str) -> Optional[Session]:
+        return await self.run(self._get, session_id)
+
+    async def delete(self, session_id: str) -> bool:
+        return await self.run(self._delete, session_id)
+
+    @asynccontextmanager
+    async def turn(self, session_id: str) -> AsyncIterator[Optional[Session]]:
+        """
+        Waits for the session's lease and yields its current state (None if it
+        doesn't exist). Changes are saved on leaving, unless the block raised.
+        """
+        lease = uuid.uuid4().hex
+        while (acquired := await self.run(self._acquire, session_id, lease)) is False:
+            await asyncio.sleep(LEASE_POLL_SECONDS)
+        if acquired is None:
+            yield None
+            return
+
+        session, completed = None, None
+        try:
+            session = await self.run(self._get, session_id)
+            yield session
+            completed = session
+        finally:
+            await self.run(self._release, session_id, lease, completed)
+
+    async def compact(self, session: Session) -> None:
+        """Shrinks the stored history until the prompt fits the token budget, keeping the newest turn."""
+        if estimate_tokens(session.prompt()) <= self.token_budget:
+            return
+
+        fixed = estimate_tokens(session.system) + (SUMMARY_RESERVE_TOKENS if self.strategy == "summarize" else 0)
+        kept: list[Message] = []
+        total = fixed
+        for message in reversed(session.turns):
+            cost = estimate_tokens([message])
+            if kept and total + cost > self.token_budget:
+                break
+            kept.insert(0, message)
+            total += cost
+        dropped = session.turns[:len(session.turns) - len(kept)]
+        session.turns = kept
+
+        if self.strategy == "summarize" and dropped:
+            transcript = "\n".join(f"{message.role}: {message.content}" for message in dropped)
+            if session.summary:
+                transcript = f"Earlier summary: {session.summary}\n{transcript}"
+            try:
+                session.summary = await complete([
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": transcript},
+                ])
+            except LLMRequestError:
+                pass  # Keep the previous summary; the dropped turns are simply truncated
+
+    async def ask(self, session_id: str, content: str) -> Optional[Message]:
+        """The reply to a new user turn, or None if the session doesn't exist."""
+        try:
+            async with self.turn(session_id) as session:
+                if session is None:
+                    return None
+                session.turns.append(Message(role='user', content=content))
+                await self.compact(session)
+                reply = Message(role='assistant', content=await get_reply(session.prompt()))
+                session.turns.append(reply)
+                return reply
+        except LLMRequestError as e:
+            # Shown as the reply but kept out of the history, where it would be resent every later turn
+            return Message(role='assistant', content=str(e))
+
+    async def stream(self, session_id: str, content: str) -> AsyncIterator[str]:
+        """Streams the reply to a new user turn; nothing is saved if the stream fails, is rejected or is abandoned."""
+        try:
+            async with self.turn(session_id) as session:
+                if session is None:
+                    raise LookupError(f"session {session_id} not found")
+                session.turns.append(Message(role='user', content=content))
+                await self.compact(session)
+                parts = []
+                async for delta in stream_reply(session.prompt()):
+                    parts.append(delta)
+                    yield delta
+                session.turns.append(Message(role='assistant', content="".join(parts)))
+        except LLMRequestError as e:
+            yield str(e)
+
+SESSION_DB_PREFIX = "chord-coordinator-sessions-"
+
+def default_session_db() -> str:
+    """
+    Private and in-memory for a lone server process. When uvicorn runs the
+    app in subprocesses (--workers / WEB_CONCURRENCY), a file in the temp
+    directory named after the supervisor's PID: its workers share it, while
+    other servers on the host and the next restart get their own.
+    """
+    # `python main.py` workers import this while re-running __main__, before multiprocessing records their parent
+    if int(os.environ.get("WEB_CONCURRENCY", "1")) <= 1 and multiprocessing.parent_process() is None:
+        return ":memory:"
+    directory = tempfile.gettempdir()
+    remove_stale_session_dbs(directory)
+    return os.path.join(directory, f"{SESSION_DB_PREFIX}{os.getppid()}.sqlite3")
+
+def remove_stale_session_dbs(directory: str) -> None:
+    """Deletes default session files (and their WAL/shm files) left by supervisors that are no longer running."""
+    for name in os.listdir(directory):
+        if not name.startswith(SESSION_DB_PREFIX):
+            continue
+        pid = name[len(SESSION_DB_PREFIX):].split(".", 1)[0]
+        if pid.isdigit() and not process_running(int(pid)):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass  # Another worker removed it first, or it belongs to another user
+
+def process_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by someone else
+    return True
+
+store = SessionStore(
+    path=os.environ.get("LLM_SESSION_DB") or default_session_db(),
+    token_budget=int(os.environ.get("LLM_HISTORY_TOKEN_BUDGET", "3000")),
+    strategy=os.environ.get("LLM_HISTORY_COMPACTION", "truncate"),
+    max_sessions=int(os.environ.get("LLM_MAX_SESSIONS", "1000")),
+    ttl=float(os.environ.get("LLM_SESSION_TTL", "3600")),
+)
@@ -0,0 +1,262 @@
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, Literal, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import metrics
+from chords import get_chord_notes, get_note_index
+
+try:
+    import soundfile
+except ImportError:  # WAV still works; Ogg output is unavailable
+    soundfile = None
+
+# Server-side chord rendering: get_chord_notes -> a guitar-like voicing ->
+# additive or Karplus-Strong synthesis -> 16-bit PCM, encoded as WAV or Ogg
+# Vorbis and streamed a chunk at a time.
+
+AudioFormat = Literal["wav", "ogg"]
+Engine = Literal["pluck", "additive"]
+
+SAMPLE_RATE = 44100
+CHUNK_SAMPLES = 16384
+BASS_MIDI = 40  # Low E; the bass note is voiced in the octave above it
+STRUM_SECONDS = 0.012  # Delay between strings of a down-strum
+FADE_SECONDS = 0.02  # Damping at the end of each chord, so chord changes don't click
+PEAK = 0.8
+MAX_RENDER_SECONDS = 600.0
+MIN_CHORD_SECONDS = 0.1  # Shorter chords would be little more than the strum
+
+MEDIA_TYPES = {"wav": "audio/wav", "ogg": "audio/ogg"}
+
+def available_formats() -> List[str]:
+    return ["wav", "ogg"] if soundfile else ["wav"]
+
+def midi_to_hz(midi: int) -> float:
+    return 440.0 * 2 ** ((midi - 69) / 12)
+
+def chord_voicing(chord_name: str) -> Optional[List[int]]:
+    """
+    MIDI notes for a chord name: the root (or the slash-chord bass) in the
+    low octave, then every chord tone stacked above it, root doubled on top.
+    'C Major/E' -> E in the bass. None if the chord is unknown.
+    """
+    name, bass = chord_name, None
+    notes = get_chord_notes(name)
+    if not notes and "/" in chord_name:
+        name, bass = chord_name.rsplit("/", 1)
+        notes = get_chord_notes(name)
+        if get_note_index(bass) == -1:
+            return None
+    if not notes:
+        return None
+
+    root = BASS_MIDI + (get_note_index(name.split(" ", 1)[0]) - BASS_MIDI) % 12
+    low = root if bass is None else BASS_MIDI + (get_note_index(bass) - BASS_MIDI) % 12
+    intervals = sorted((get_note_index(note) - root) % 12 for note in notes)
+    return [low] + [root + 12 + interval for interval in intervals] + [root + 24]
+
+def pluck(hz: float, samples: int, sample_rate: int, seed: int) -> np.ndarray:
+    """
+    Karplus-Strong plucked string. The recurrence y[n] = (y[n-N] + y[n-N-1]) / 2
+    only reaches back one period, so it runs a whole period at a time in NumPy.
+    The delay line holds a whole number of samples, and the two-point average
+    adds half a sample, so the string is resampled to the exact pitch afterwards.
+    """
+    exact_period = sample_rate / hz
+    delay = max(2, round(exact_period - 0.5))
+    step = (delay + 0.5) / exact_period  # Read position advance per output sample
+    needed = int(samples * step) + 2
+    periods = -(-needed // delay) + 1
+    out = np.empty(periods * delay)
+    burst = np.random.default_rng(seed).uniform(-1.0, 1.0, delay + 1)
+    out[:delay] = 0.5 * (burst[1:] + burst[:-1])  # A slightly softened pick
+    decay = 0.996 ** (440.0 / max(hz, 1.0))  # Extra loss so low strings don't ring forever
+    before = 0.0  # Last sample of the period before the previous one
+    for k in range(1, periods):
+        previous = out[(k - 1) * delay:k * delay]
+        shifted = np.concatenate(([before], previous[:-1]))
+        out[k * delay:(k + 1) * delay] = decay * 0.5 * (previous + shifted)
+        before = previous[-1]
+    return np.interp(np.arange(samples) * step, np.arange(len(out)), out)
+
+def additive(hz: float, samples: int, sample_rate: int, seed: int) -> np.ndarray:
+    """A decaying fundamental plus a few harmonics, each dying away faster than the one below."""
+    t = np.arange(samples) / sample_rate
+    tone = np.zeros(samples)
+    for harmonic, level in enumerate((1.0, 0.5, 0.3, 0.15), start=1):
+        if hz * harmonic < sample_rate / 2:
+            tone += level * np.exp(-t * (1.2 + 0.6 * harmonic)) * np.sin(2 * np.pi * hz * harmonic * t)
+    return tone
+
+ENGINES = {"pluck": pluck, "additive": additive}
+
+def render_voicing(voicing: Sequence[int], seconds: float, engine: Engine, sample_rate: int) -> np.ndarray:
+    """A strummed voicing as int16 PCM, faded out at the end."""
+    samples = int(seconds * sample_rate)
+    audio = np.zeros(samples)
+    for position, midi in enumerate(voicing):
+        delay = min(int(position * STRUM_SECONDS * sample_rate), samples)
+        audio[delay:] += ENGINES[engine](midi_to_hz(midi), samples - delay, sample_rate, seed=midi)
+
+    fade = min(int(FADE_SECONDS * sample_rate), samples)
+    audio[samples - fade:] *= np.linspace(1.0, 0.0, fade)
+    peak = np.abs(audio).max(initial=0.0)
+    if peak > 0:
+        audio *= PEAK / peak
+    return (audio * 32767).astype(np.int16)
+
+Rendered = Union[np.ndarray, bytes]  # PCM, or a whole encoded file
+
+def rendered_size(value: Rendered) -> int:
+    return value.nbytes if isinstance(value, np.ndarray) else len(value)
+
+class RenderCache:
+    """
+    LRU of rendered chords, bounded by total bytes rather than entry count.
+    Holds PCM (reused by progressions) and encoded single-chord files.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Tuple, Rendered]" = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()  # Renders run in the threadpool
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: Tuple) -> Optional[Rendered]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key: Tuple, value: Rendered) -> None:
+        size = rendered_size(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = value
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= rendered_size(evicted)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {**self.stats, "entries": len(self.entries), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+cache = RenderCache(int(os.environ.get("SYNTH_CACHE_BYTES", str(32 * 1024 * 1024))))
+
+def cache_metrics():
+    stats = cache.snapshot()
+    lookups = metrics.Counter("synth_cache_lookups_total", "Chord render cache lookups by outcome.", ("result",))
+    lookups.inc("hit", amount=stats["hits"])
+    lookups.inc("miss", amount=stats["misses"])
+    size = metrics.Gauge("synth_cache_bytes", "PCM held in the chord render cache.")
+    size.set(value=stats["bytes"])
+    return [lookups, size]
+
+metrics.registry.add_collector(cache_metrics)
+
+def render_chord(voicing: Sequence[int], seconds: float, engine: Engine, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    key = (tuple(voicing), round(seconds, 4), engine, sample_rate)
+    pcm = cache.get(key)
+    if pcm is None:
+        pcm = render_voicing(voicing, seconds, engine, sample_rate)
+        pcm.flags.writeable = False  # Shared between requests
+        cache.set(key, pcm)
+    return pcm
+
+def wav_header(samples: int, sample_rate: int) -> bytes:
+    """Header for mono 16-bit PCM; the length is known up front, so the body can stream after it."""
+    data_bytes = samples * 2
+    return (
+        b"RIFF" + struct.pack("<I", 36 + data_bytes) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+        + b"data" + struct.pack("<I", data_bytes)
+    )
+
+class _Sink:
+    """Write-only file object for libsndfile; encoded bytes are collected and handed out as they appear."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.position  # The Ogg writer only asks where it is
+
+    def read(self, size: int = -1) -> bytes:
+        return b""
+
+    def take(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+def encode(segments: Iterator[np.ndarray], total_samples: int, audio_format: AudioFormat, sample_rate: int) -> Iterator[bytes]:
+    """Streams int16 PCM segments as a WAV or Ogg Vorbis file, CHUNK_SAMPLES at a time."""
+    if audio_format == "wav":
+        yield wav_header(total_samples, sample_rate)
+        for pcm in segments:
+            for start in range(0, len(pcm), CHUNK_SAMPLES):
+                yield pcm[start:start + CHUNK_SAMPLES].astype("<i2", copy=False).tobytes()
+        return
+
+    sink = _Sink()
+    with soundfile.SoundFile(sink, "w", sample_rate, 1, format="OGG", subtype="VORBIS") as ogg:
+        for pcm in segments:
+            for start in range(0, len(pcm), CHUNK_SAMPLES):
+                ogg.write(pcm[start:start + CHUNK_SAMPLES])
+                data = sink.take()
+                if data:
+                    yield data
+    yield sink.take()
+
+def stream_chord_audio(voicing: Sequence[int], seconds: float, engine: Engine, audio_format: AudioFormat) -> Iterator[bytes]:
+    """
+    A single chord as a file. The encoded file is cached as well as the PCM,
+    so a repeat play streams from memory without encoding (Vorbis is the
+    expensive part). A generator, so rendering happens as the response is
+    consumed (in the threadpool), not in the endpoint.
+    """
+    key = (tuple(voicing), round(seconds, 4), engine, SAMPLE_RATE, audio_format)
+    data = cache.get(key)
+    if data is not None:
+        for start in range(0, len(data), CHUNK_SAMPLES * 2):
+            yield data[start:start + CHUNK_SAMPLES * 2]
+        return
+
+    pcm = render_chord(voicing, seconds, engine)
+    parts = []
+    for chunk in encode(iter([pcm]), len(pcm), audio_format, SAMPLE_RATE):
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, b"".join(parts))
+
+def stream_progression_audio(voicings: Sequence[Sequence[int]], seconds_per_chord: float, engine: Engine, audio_format: AudioFormat) -> Iterator[bytes]:
+    """
+    Renders chord by chord as the stream is consumed, so the first bytes go
+    out before the rest of the song is synthesized. Repeated chords come from
+    the render cache.
+    """
+    samples = int(seconds_per_chord * SAMPLE_RATE)
+    segments = (render_chord(voicing, seconds_per_chord, engine) for voicing in voicings)
+    yield from encode(segments, samples * len(voicings), audio_format, SAMPLE_RATE)
@@ -0,0 +1,152 @@
+"""
+Precomputed lookup tables in one binary file, shared by every worker.
+
+The tables that are expensive to build (fuzzy match candidates, key fits)
+are written once at image build time with
+
+    uv run python -m tables
+
+and each worker maps the file read-only instead of building its own copy,
+so the pages are shared through the page cache and memory stays flat as
+workers are added. Without the file (or with a stale one) every table is
+built in-process exactly as before, so local development needs no build step.
+
+Layout: MAGIC, a little-endian u32 header length, a JSON header
+{"sources": digest, "tables": {name: {dtype, shape, offset}}}, then the
+data section, 64-byte aligned, holding each array's raw bytes at its
+(aligned) offset from the start of the section.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+MAGIC = b"CCTABLE1"
+ALIGN = 64
+
+BACKEND_DIR = Path(__file__).parent
+TABLES_PATH = os.environ.get("TABLES_PATH", str(BACKEND_DIR / "tables.bin"))
+
+# The modules whose code defines the tables; editing any of them makes a saved file stale
+SOURCES = ("tables.py", "chords.py", "progressions.py")
+
+Builder = Callable[[], Union[np.ndarray, Tuple[np.ndarray, ...]]]
+
+def aligned(size: int) -> int:
+    return -(-size // ALIGN) * ALIGN
+
+def source_digest() -> str:
+    digest = hashlib.sha256()
+    for name in SOURCES:
+        digest.update((BACKEND_DIR / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+class TableFile:
+    """A table file mapped read-only; arrays are views straight into the mapping."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a table file")
+        (header_size,) = struct.unpack_from("<I", self.buffer, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(self.buffer[start:start + header_size])
+        self.data_start = aligned(start + header_size)
+
+    def get(self, name: str) -> Optional[np.ndarray]:
+        entry = self.header["tables"].get(name)
+        if entry is None:
+            return None
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        return np.frombuffer(self.buffer, dtype, count, self.data_start + entry["offset"]).reshape(entry["shape"])
+
+def open_table_file() -> Optional[TableFile]:
+    """The saved tables, or None if there is no file or it was built from different sources."""
+    if not TABLES_PATH or not os.path.isfile(TABLES_PATH):
+        return None
+    table_file = TableFile(TABLES_PATH)
+    if table_file.header["sources"] != source_digest():
+        print(f"tables: {TABLES_PATH} is stale, building tables in-process", file=sys.stderr)
+        return None
+    return table_file
+
+table_file = open_table_file()
+
+# name(s) -> builder, for every table a module registered, so `write` can rebuild them all
+builders: Dict[Tuple[str, ...], Builder] = {}
+
+def register(names: Union[str, Sequence[str]], build: Builder) -> None:
+    """Adds a table (or several produced by one builder) to the file without loading it, for tables built lazily."""
+    builders[(names,) if isinstance(names, str) else tuple(names)] = build
+
+def lookup(name: str) -> Optional[np.ndarray]:
+    return table_file.get(name) if table_file else None
+
+def load(names: Union[str, Sequence[str]], build: Builder):
+    """
+    A registered table, mapped from the table file when it has it, else
+    built in-process. `names` may be a tuple for a builder returning several
+    arrays, which are returned as a tuple in the same order.
+    """
+    register(names, build)
+    if isinstance(names, str):
+        array = lookup(names)
+        return build() if array is None else array
+    arrays = tuple(lookup(name) for name in names)
+    return build() if any(array is None for array in arrays) else arrays
+
+def write(path: str) -> Dict[str, np.ndarray]:
+    """Rebuilds every registered table and writes them to `path`; returns the arrays by name."""
+    arrays: Dict[str, np.ndarray] = {}
+    for names, build in builders.items():
+        built = build()
+        arrays.update(zip(names, (built,) if len(names) == 1 else built))
+
+    entries, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += aligned(array.nbytes)
+
+    header = json.dumps({"sources": source_digest(), "tables": entries}).encode()
+    data_start = aligned(len(MAGIC) + 4 + len(header))
+
+    # Write-then-rename: running workers keep the file they mapped, new ones get this one
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+    return arrays
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the shared lookup table file.")
+    parser.add_argument("path", nargs="?", default=TABLES_PATH, help=f"output file (default: TABLES_PATH, {TABLES_PATH})")
+    args = parser.parse_args()
+
+    # Importing the owners registers their tables
+    import chords, progressions  # noqa: F401
+
+    arrays = write(args.path)
+    for name, array in arrays.items():
+        print(f"{name:32} {str(array.dtype):8} {str(array.shape):16} {array.nbytes:>10,} bytes")
+    print(f"wrote {args.path} ({os.path.getsize(args.path):,} bytes)")
+
+if __name__ == "__main__":
+    # `python -m tables` runs this file as __main__; the table owners import
+    # `tables`, so register with and write from that module, not this copy
+    import tables
+    tables.main()
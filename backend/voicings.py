@@ -0,0 +1,221 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from chords import CHORD_DEFINITIONS, CHORD_INDEX, NOTES, parse_chord_name, pitch_class_mask
+
+# Open-string MIDI notes, lowest string first (mirrors TUNINGS in the frontend store)
+TUNINGS: Dict[str, Tuple[int, ...]] = {
+    "Standard": (40, 45, 50, 55, 59, 64),
+    "Drop D": (38, 45, 50, 55, 59, 64),
+    "Double Drop D": (38, 45, 50, 55, 59, 62),
+    "DADGAD": (38, 45, 50, 55, 57, 62),
+    "Open G": (38, 43, 50, 55, 59, 62),
+    "Open D": (38, 45, 50, 54, 57, 62),
+    "All Fourths": (40, 45, 50, 55, 60, 65),
+}
+
+MAX_FRET = 24
+MIN_SOUNDING_STRINGS = 4
+MAX_FINGERS = 4
+VOICING_CACHE_SIZE = 256
+
+# A voicing is one fret per string (None = muted), lowest string first
+Voicing = Tuple[Optional[int], ...]
+
+def parse_tuning(tuning: str) -> Optional[Tuple[int, ...]]:
+    """
+    A tuning name from TUNINGS, or six comma-separated open-string MIDI
+    notes such as '40,45,50,55,59,64'.
+    """
+    if tuning in TUNINGS:
+        return TUNINGS[tuning]
+    try:
+        strings = tuple(int(midi) for midi in tuning.split(","))
+    except ValueError:
+        return None
+    if len(strings) != 6 or not all(0 <= midi < 128 for midi in strings):
+        return None
+    return strings
+
+def get_voicings(chord_name: str, tuning: Tuple[int, ...], capo: int = 0, span: int = 4, offset: int = 0, limit: Optional[int] = None) -> Optional[Dict]:
+    """
+    Playable voicings of a chord, best first, sliced to [offset, offset + limit).
+    Every chord tone must sound, at least four strings must be played, fretted
+    notes fit within `span` frets and need no more than four fingers (a shared
+    lowest fret is barred). Frets are absolute; with a capo, the capo fret
+    counts as open. Returns None for an unknown chord.
+    """
+    parsed = parse_chord_name(chord_name)
+    if not parsed:
+        return None
+    voicings = _ranked_voicings(NOTES[parsed[0]], parsed[1], tuning, capo, span)
+    end = None if limit is None else offset + limit
+    return {
+        "total": len(voicings),
+        "voicings": [describe_voicing(voicing, tuning, parsed[0], capo) for voicing in voicings[offset:end]],
+    }
+
+@lru_cache(maxsize=VOICING_CACHE_SIZE)
+def _ranked_voicings(root_name: str, type_str: str, tuning: Tuple[int, ...], capo: int, span: int) -> Tuple[Voicing, ...]:
+    root_idx = NOTES.index(root_name)
+    chord_mask = pitch_class_mask(root_idx + interval for interval in CHORD_DEFINITIONS[type_str])
+    voicings = enumerate_voicings(chord_mask, tuning, capo, span)
+    return tuple(sorted(voicings, key=lambda voicing: voicing_rank(voicing, tuning, root_idx, capo)))
+
+def enumerate_voicings(chord_mask: int, tuning: Tuple[int, ...], capo: int, span: int) -> List[Voicing]:
+    """
+    Depth-first search over strings. Each string only considers frets that
+    sound a chord tone, and a branch is cut as soon as the fretted notes
+    exceed the span or the strings left can no longer supply the missing
+    chord tones.
+    """
+    string_count = len(tuning)
+    options = [
+        [fret for fret in range(capo, MAX_FRET + 1) if chord_mask >> ((open_midi + fret) % 12) & 1]
+        for open_midi in tuning
+    ]
+    results: List[Voicing] = []
+    frets: List[Optional[int]] = []
+
+    def search(string: int, mask: int, sounding: int, low: int, high: int) -> None:
+        remaining = string_count - string
+        if sounding + remaining < MIN_SOUNDING_STRINGS:
+            return
+        if bin(chord_mask & ~mask).count("1") > remaining:
+            return
+        if string == string_count:
+            if mask == chord_mask and fingers_needed(frets, capo) <= MAX_FINGERS:
+                results.append(tuple(frets))
+            return
+
+        frets.append(None)
+        search(string + 1, mask, sounding, low, high)
+        frets.pop()
+
+        for fret in options[string]:
+            if fret > capo:
+                new_low, new_high = min(low, fret), max(high, fret)
+                if new_high - new_low >= span:
+                    if fret > new_low:
+                        break  # frets only get higher from here
+                    continue
+            else:
+                new_low, new_high = low, high
+            frets.append(fret)
+            search(string + 1, mask | 1 << ((tuning[string] + fret) % 12), sounding + 1, new_low, new_high)
+            frets.pop()
+
+    search(0, 0, 0, MAX_FRET + 1, -1)
+    return results
+
+def fingers_needed(frets: List[Optional[int]], capo: int) -> int:
+    fretted = [fret for fret in frets if fret is not None and fret > capo]
+    if not fretted:
+        return 0
+    lowest = min(fretted)
+    # One finger barres everything on the lowest fret
+    return 1 + sum(1 for fret in fretted if fret != lowest)
+
+def voicing_stretch(voicing: Voicing, capo: int) -> int:
+    fretted = [fret for fret in voicing if fret is not None and fret > capo]
+    return max(fretted) - min(fretted) if fretted else 0
+
+def voicing_rank(voicing: Voicing, tuning: Tuple[int, ...], root_idx: int, capo: int) -> Tuple:
+    """
+    Root in the bass first, then no muted strings inside the shape, then the
+    smallest stretch (each five frets up the neck counts as one more fret of
+    reach), lowest position and most strings.
+    """
+    sounding = [string for string, fret in enumerate(voicing) if fret is not None]
+    bass_idx = (tuning[sounding[0]] + voicing[sounding[0]]) % 12
+    # Muted strings between sounding ones are harder to play cleanly
+    inner_mutes = sounding[-1] - sounding[0] + 1 - len(sounding)
+    fretted = [fret for fret in voicing if fret is not None and fret > capo]
+    position = min(fretted) if fretted else capo
+    reach = voicing_stretch(voicing, capo) + (position - capo) // 5
+    return (bass_idx != root_idx, inner_mutes, reach, position, -len(sounding))
+
+def describe_voicing(voicing: Voicing, tuning: Tuple[int, ...], root_idx: int, capo: int) -> Dict:
+    notes = [NOTES[(open_midi + fret) % 12] if fret is not None else None for open_midi, fret in zip(tuning, voicing)]
+    bass = next(note for note in notes if note is not None)
+    return {
+        "frets": list(voicing),
+        "notes": notes,
+        "bass": bass,
+        "root_position": bass == NOTES[root_idx],
+        "stretch": voicing_stretch(voicing, capo),
+    }
+
+def sounding_midi(voicing: Voicing, tuning: Tuple[int, ...]) -> List[int]:
+    return [open_midi + fret for open_midi, fret in zip(tuning, voicing) if fret is not None]
+
+def chord_tone_degrees(intervals: frozenset) -> Dict[int, int]:
+    """
+    Each interval's place when the chord is stacked in thirds: 0 root, 1 third
+    (or the 2nd/4th of a sus chord), 2 fifth, 3 seventh (or sixth), 4 ninth,
+    5 eleventh, 6 thirteenth. Altered tones take the degree they alter.
+    """
+    has_third = 3 in intervals or 4 in intervals
+    # A b5/#5 beside a fifth or other tensions is a #11/b13
+    upper = 7 in intervals or 1 in intervals or 2 in intervals or {3, 4} <= intervals
+    degrees = {}
+    for interval in intervals:
+        if interval == 0:
+            degree = 0
+        elif interval in (3, 4):
+            degree = 4 if interval == 3 and 4 in intervals else 1  # A minor 3rd beside a major one is a #9
+        elif interval in (2, 5):
+            degree = (4 if interval == 2 else 5) if has_third else 1
+        elif interval == 1:
+            degree = 4
+        elif interval == 6:
+            degree = 5 if upper else 2
+        elif interval == 7:
+            degree = 2
+        elif interval == 8:
+            degree = 6 if upper else 2
+        elif interval == 9:
+            degree = 6 if 10 in intervals or 11 in intervals else 3
+        else:
+            degree = 3
+        degrees[interval] = degree
+    return degrees
+
+CHORD_TONE_DEGREES = {name: chord_tone_degrees(intervals) for name, intervals in CHORD_DEFINITIONS.items()}
+
+def identify_shape(positions: List[Tuple[int, int]], tuning: Tuple[int, ...]) -> Dict:
+    """
+    Identifies a chord from (string, fret) positions, lowest string = 0.
+    Unlike identify_chord, the bass is the lowest sounding pitch, so inversions
+    are reported exactly; `inversion` is the bass's degree from CHORD_TONE_DEGREES.
+    """
+    frets: List[Optional[int]] = [None] * len(tuning)
+    for string, fret in positions:
+        if not 0 <= string < len(tuning) or not 0 <= fret <= MAX_FRET:
+            return {"found": False, "message": "Invalid fretboard position."}
+        if frets[string] is not None:
+            return {"found": False, "message": "Select one fret per string."}
+        frets[string] = fret
+    voicing = tuple(frets)
+
+    midi_notes = sounding_midi(voicing, tuning)
+    note_indices = {midi % 12 for midi in midi_notes}
+    if len(note_indices) < 3:
+        return {"found": False, "message": "Select at least 3 unique notes."}
+    bass_idx = min(midi_notes) % 12
+
+    matches = CHORD_INDEX[pitch_class_mask(note_indices)]
+    if not matches:
+        return {"found": False, "message": "No specific chord found for these notes."}
+    # Prefer the reading whose root is the bass note
+    root_idx, root_name, chord_name, full_name = next((m for m in matches if m[0] == bass_idx), matches[0])
+    inversion = CHORD_TONE_DEGREES[chord_name][(bass_idx - root_idx) % 12]
+    bass = NOTES[bass_idx]
+    return {
+        "found": True,
+        "root": root_name,
+        "chord": chord_name,
+        "name": full_name if inversion == 0 else f"{full_name}/{bass}",
+        "bass": bass,
+        "inversion": inversion,
+    }